@@ -1,130 +1,248 @@
 
+import csv
+import hmac
+import io
+import math
 import os
 from dotenv import load_dotenv
 load_dotenv()   # must be FIRST
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 
+from jinja2 import FileSystemBytecodeCache
 from flask import (
     Flask, render_template, request,
-    redirect, url_for, send_from_directory,
-    session, flash
+    redirect, url_for, abort, jsonify,
+    session, flash, Response, stream_with_context
 )
+from sqlalchemy.exc import SQLAlchemyError
 
-from config import Config
+from config import Config, engine_options, engine_profile
 from models import db
+from utils.db_engine import configure_engine
+from utils.db_routing import init_replica_routing, replica_binds, replica_reads
+from utils.metrics import clear_metrics, init_metrics, render_metrics
+from utils.compression import init_compression
+from utils.profiler import (
+    collapsed_stacks, init_profiler, list_profiles, load_profile
+)
 
 # ---------------- APP INIT ----------------
 app = Flask(__name__)
 app.config.from_object(Config)
+app.config["SQLALCHEMY_BINDS"] = replica_binds(
+    app.config["DATABASE_REPLICA_URLS"], lambda url: engine_options(engine_profile(url))
+)
 
 db.init_app(app)
 
-<<<<<<< HEAD
 with app.app_context():
-    db.create_all()
-=======
->>>>>>> 4a6dede (Fix all code changes)
+    # the primary, plus any DATABASE_REPLICA_URLS binds
+    for engine in db.engines.values():
+        configure_engine(engine, app.config)
+    init_metrics(app, *db.engines.values())
+
+init_replica_routing(app)
+init_profiler(app)
+init_compression(app)
 
 from functools import wraps
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from utils.qr_generator import generate_upi_qr
-from utils.receipt import generate_receipt
-from utils.email_service import send_email
+from utils.qr_generator import (
+    evict_qr_files, qr_cache, upi_link, upi_qr_key, upi_qr_png
+)
+from utils.email_outbox import (
+    enqueue_email, outbox_status, start_outbox_worker
+)
+from utils.pagination import keyset_paginate, page_size
+from utils.file_delivery import (
+    DELIVERY_MODES, send_blob, send_data, send_precompressed, send_upload
+)
+from utils.assets import asset_url, build_assets
+from utils.bulk_import import KINDS as IMPORT_KINDS, import_materials
+from utils.bulk_delete import DELETABLE, BulkDelete
+from utils.image_variants import make_variants, new_stem, remove_variants, variant_name
+from utils.blob_store import release_blob, remove_unreferenced, store_upload
+from utils.page_cache import (
+    PAID_FILES, PUBLIC_PAGES, PageCache, bump_content_version, cached_page,
+    content_version, page_cache
+)
+from utils.download_tokens import (
+    is_signed_token, make_download_token, read_download_token
+)
 
 from models.user import User
 from models.notice import Notice
 from models.study_material import StudyMaterial
 from models.announcement import Announcement
 from models.paid_material import PaidMaterial
-from models.payment import Payment
+from models.payment import Payment, record_payment
 from models.faculty import Faculty
+from models.email_outbox import EmailOutbox
+from models.migrations import run_migrations
+from models.site_counter import read_counters
+from models.search_index import MAX_PAGE, find_documents
 
-# ---------------- APP INIT ----------------
-# ---------------- ADMIN BOOTSTRAP (LOCAL + RENDER SAFE) ----------------
+# ---------------- FILE UPLOAD CONFIG ----------------
+UPLOAD_ROOT = os.environ.get("UPLOAD_ROOT", os.path.join(BASE_DIR, "uploads"))
+BLOB_FOLDER = os.path.join(UPLOAD_ROOT, "blobs")
+NOTICE_FOLDER = os.path.join(UPLOAD_ROOT, "notices")
+STUDY_MATERIAL_FOLDER = os.path.join(UPLOAD_ROOT, "study_materials")
+ANNOUNCEMENT_FOLDER = os.path.join(UPLOAD_ROOT, "announcements")
+PAID_MATERIAL_FOLDER = os.path.join(UPLOAD_ROOT, "paid_materials")
+RECEIPT_FOLDER = os.path.join(UPLOAD_ROOT, "receipts")
+QR_FOLDER = os.path.join(UPLOAD_ROOT, "qr_codes")
+FACULTY_FOLDER = os.path.join(BASE_DIR, "static", "faculty")
+ASSET_FOLDER = os.path.join(BASE_DIR, "static", "dist")
 
-def bootstrap_admin():
+
+app.config["FACULTY_FOLDER"] = FACULTY_FOLDER
+app.config["ASSET_FOLDER"] = ASSET_FOLDER
+app.jinja_env.globals["asset_url"] = asset_url
+
+app.config["QR_FOLDER"] = QR_FOLDER
+page_cache.max_entries = app.config["PAGE_CACHE_SIZE"]
+qr_cache.max_entries = app.config["QR_CACHE_SIZE"]
+paid_file_cache = PageCache(app.config["PAID_FILE_CACHE_SIZE"])
+
+if app.config["FILE_DELIVERY"] not in DELIVERY_MODES:
+    raise RuntimeError(f"FILE_DELIVERY must be one of {DELIVERY_MODES}")
+app.config["USE_X_SENDFILE"] = app.config["FILE_DELIVERY"] == "x-sendfile"
+
+app.config.update({
+    "UPLOAD_ROOT": UPLOAD_ROOT,
+    "BLOB_FOLDER": BLOB_FOLDER,
+    "NOTICE_FOLDER": NOTICE_FOLDER,
+    "STUDY_MATERIAL_FOLDER": STUDY_MATERIAL_FOLDER,
+    "ANNOUNCEMENT_FOLDER": ANNOUNCEMENT_FOLDER,
+    "PAID_MATERIAL_FOLDER": PAID_MATERIAL_FOLDER,
+    "RECEIPT_FOLDER": RECEIPT_FOLDER
+})
+
+# compiled templates are shared by every worker and restart
+if app.config["JINJA_CACHE_DIR"] and os.path.isdir(app.config["JINJA_CACHE_DIR"]):
+    app.jinja_options = {
+        **app.jinja_options,
+        "bytecode_cache": FileSystemBytecodeCache(app.config["JINJA_CACHE_DIR"])
+    }
+
+
+# ---------------- APP FACTORY ----------------
+def create_app():
     """
-    Creates tables and admin user safely.
-    Works on LOCAL and RENDER.
+    WSGI entry point, e.g. gunicorn --preload "app:create_app()".
+
+    Importing this module only defines the app: no database queries,
+    disk writes or threads, so a preloading master can fork workers
+    cheaply. One-time setup is the `flask --app app bootstrap` command;
+    the email sender thread starts with each worker's first request.
     """
+    return app
 
-    admin_email = os.environ.get("ADMIN_EMAIL")
-    admin_password = os.environ.get("ADMIN_PASSWORD")
 
-    if not admin_email or not admin_password:
-        print("⚠️ Admin env vars not found. Skipping admin bootstrap.")
-        return
+@app.before_request
+def start_email_worker():
+    if app.config["EMAIL_WORKER_THREAD"]:
+        start_outbox_worker(app)
 
-    with app.app_context():
-        db.create_all()
+# ---------------- BOOTSTRAP (run once per deploy) ----------------
+def bootstrap_app():
+    """
+    Migrates the database, creates upload folders, syncs the admin user,
+    builds static assets and precompiles templates. Needs an app context.
+    """
 
-        admin = User.query.filter_by(email=admin_email).first()
+    run_migrations(verbose=True)
 
-        if not admin:
-            admin = User(
-                name="Administrator",
-                email=admin_email,
-                role="admin",
-                password=generate_password_hash(admin_password)
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Admin created")
-        else:
-            # keep password synced with env
-            admin.password = generate_password_hash(admin_password)
-            db.session.commit()
-            print("ℹ️ Admin already exists (password synced)")
+    for folder in [
+        NOTICE_FOLDER,
+        STUDY_MATERIAL_FOLDER,
+        ANNOUNCEMENT_FOLDER,
+        PAID_MATERIAL_FOLDER,
+        RECEIPT_FOLDER,
+        QR_FOLDER,
+        BLOB_FOLDER,
+        FACULTY_FOLDER
+    ]:
+        os.makedirs(folder, exist_ok=True)
 
+    # QR images are served from memory now; drop files from older versions
+    evict_qr_files(QR_FOLDER)
 
-# ✅ run once at startup
-bootstrap_admin()
+    # totals restart with the new workers
+    clear_metrics(app.config["METRICS_DIR"])
 
+    bootstrap_admin()
+    build_static_assets()
+    precompile_templates()
 
 
+@app.cli.command("bootstrap")
+def bootstrap_command():
+    """One-time setup; run on every deploy, before starting workers."""
+    bootstrap_app()
 
 
+@app.cli.command("assets")
+def assets_command():
+    """Rebuilds minified, fingerprinted CSS/JS (also part of bootstrap)."""
+    build_static_assets()
 
-# ---------------- BASE DIRECTORY ----------------
 
+def build_static_assets():
+    manifest = build_assets(app.static_folder, app.config["ASSET_FOLDER"])
+    for name, built in manifest.items():
+        print(f"Built {name} -> {built}")
 
-# ---------------- CREATE TABLES + ADMIN ----------------
 
-# ---------------- FILE UPLOAD CONFIG ----------------
-NOTICE_FOLDER = os.path.join(BASE_DIR, "uploads", "notices")
-STUDY_MATERIAL_FOLDER = os.path.join(BASE_DIR, "uploads", "study_materials")
-ANNOUNCEMENT_FOLDER = os.path.join(BASE_DIR, "uploads", "announcements")
-PAID_MATERIAL_FOLDER = os.path.join(BASE_DIR, "uploads", "paid_materials")
-RECEIPT_FOLDER = os.path.join(BASE_DIR, "uploads", "receipts")
-QR_FOLDER = os.path.join(BASE_DIR, "uploads", "qr_codes")
-FACULTY_FOLDER = os.path.join(BASE_DIR, "static", "faculty")
+def bootstrap_admin():
+    """Creates the admin user from ADMIN_EMAIL / ADMIN_PASSWORD."""
 
+    admin_email = os.environ.get("ADMIN_EMAIL")
+    admin_password = os.environ.get("ADMIN_PASSWORD")
 
-app.config["FACULTY_FOLDER"] = FACULTY_FOLDER
+    if not admin_email or not admin_password:
+        print("⚠️ Admin env vars not found. Skipping admin bootstrap.")
+        return
 
-for folder in [
-    NOTICE_FOLDER,
-    STUDY_MATERIAL_FOLDER,
-    ANNOUNCEMENT_FOLDER,
-    PAID_MATERIAL_FOLDER,
-    RECEIPT_FOLDER,
-    QR_FOLDER,
-    FACULTY_FOLDER 
-]:
-    os.makedirs(folder, exist_ok=True)
-app.config["QR_FOLDER"] = QR_FOLDER
+    admin = User.query.filter_by(email=admin_email).first()
 
-app.config.update({
-    "NOTICE_FOLDER": NOTICE_FOLDER,
-    "STUDY_MATERIAL_FOLDER": STUDY_MATERIAL_FOLDER,
-    "ANNOUNCEMENT_FOLDER": ANNOUNCEMENT_FOLDER,
-    "PAID_MATERIAL_FOLDER": PAID_MATERIAL_FOLDER,
-    "RECEIPT_FOLDER": RECEIPT_FOLDER
-})
+    if not admin:
+        admin = User(
+            name="Administrator",
+            email=admin_email,
+            role="admin",
+            password=generate_password_hash(admin_password)
+        )
+        db.session.add(admin)
+        db.session.commit()
+        print("✅ Admin created")
+    elif not check_password_hash(admin.password, admin_password):
+        # keep password synced with env
+        admin.password = generate_password_hash(admin_password)
+        db.session.commit()
+        print("ℹ️ Admin password synced")
+    else:
+        print("ℹ️ Admin already exists")
+
+
+def precompile_templates():
+    """Fills the Jinja bytecode cache so workers skip template compiling."""
+
+    cache_dir = app.config["JINJA_CACHE_DIR"]
+    if not cache_dir:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"Precompiled {len(names)} templates")
 
 # ---------------- ADMIN DECORATOR ----------------
 def admin_required(f):
@@ -135,6 +253,101 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ---------------- LISTING PAGINATION ----------------
+def paginate_listing(query, created_col, id_col, row_key=None):
+    """Keyset page for ?after= / ?before= / ?per_page= on a listing."""
+    return keyset_paginate(
+        query,
+        created_col,
+        id_col,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=page_size(
+            request.args.get("per_page"),
+            app.config["PAGE_SIZE"],
+            app.config["PAGE_SIZE_MAX"]
+        ),
+        row_key=row_key
+    )
+
+# ---------------- UPLOADED FILES ----------------
+def send_stored_file(hash_column, folder, filename, digest, **kwargs):
+    """
+    Sends an upload by digest (blob store) or, for rows saved before the
+    blob store, by file name from its old folder. A digest is only served
+    if a row of this kind references it, so paid blobs stay private.
+    """
+    if digest:
+        if db.session.query(hash_column).filter(hash_column == digest).first() is None:
+            abort(404)
+        return send_blob(digest, filename, **kwargs)
+
+    return send_upload(folder, filename, as_attachment=True, **kwargs)
+
+
+def drop_stored_file(folder, filename, digest):
+    """
+    Releases a row's upload. Returns blob paths to pass to
+    remove_unreferenced() after the commit.
+    """
+    if digest:
+        return [release_blob(digest)]
+
+    # legacy upload stored by name
+    if filename:
+        file_path = os.path.join(folder, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    return []
+
+def paid_material_file(material_id):
+    """
+    (file_hash, file_name) of a paid material, or None; cached per worker
+    under the PAID_FILES version, which deletes bump. A deleted material's
+    blob can live on for other rows, so a stale entry would still serve it.
+    """
+    key = (material_id, content_version(PAID_FILES))
+    entry = paid_file_cache.get(key)
+    if entry is None:
+        material = db.session.get(PaidMaterial, material_id)
+        if material is None:
+            return None
+        entry = (material.file_hash, material.file_name)
+        paid_file_cache.set(key, entry)
+    return entry
+
+# ---------------- UPI QR ----------------
+def material_upi_link(material):
+    return upi_link(
+        os.environ.get("UPI_ID"),
+        os.environ.get("UPI_NAME"),
+        material.price
+    )
+
+
+def evict_material_qr(material):
+    """
+    Drops a material's QR at its current price from this worker's cache
+    and from disk. Without UPI_ID/UPI_NAME there is no link to drop, and
+    a failure here never fails the delete or reprice that called it.
+    """
+    try:
+        evict_qr_files(app.config["QR_FOLDER"], material.id)
+        if os.environ.get("UPI_ID") and os.environ.get("UPI_NAME"):
+            qr_cache.discard(material_upi_link(material))
+    except Exception as e:
+        app.logger.warning("QR eviction for material %s failed: %s", material.id, e)
+
+
+def prewarm_material_qr(material):
+    """
+    Renders a material's QR now so the first checkout doesn't wait.
+    Only fills the cache of the worker serving this admin request; the
+    other gunicorn workers still render it on their first checkout.
+    """
+    if os.environ.get("UPI_ID") and os.environ.get("UPI_NAME"):
+        upi_qr_png(material_upi_link(material))
+
 # ---------------- AUTH ----------------
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -159,6 +372,8 @@ def logout():
 
 # ---------------- HOME ----------------
 @app.route("/")
+@replica_reads
+@cached_page(PUBLIC_PAGES)
 def home():
     return render_template(
         "index.html",
@@ -179,68 +394,194 @@ def contact():
 @app.route("/admin")
 @admin_required
 def admin_dashboard():
+    # one query against the maintained counters, no COUNT(*) scans
+    counters = read_counters()
+
     return render_template(
         "admin_dashboard.html",
-        notice_count=Notice.query.count(),
-        announcement_count=Announcement.query.count(),
-        material_count=StudyMaterial.query.count(),
-        paid_material_count=PaidMaterial.query.count()
+        notice_count=counters["notices"].count,
+        announcement_count=counters["announcements"].count,
+        material_count=counters["study_materials"].count,
+        paid_material_count=counters["paid_materials"].count,
+        payment_count=counters["payments"].count,
+        revenue=counters["payments"].total
     )
 
 # ---------------- ADMIN PAYMENT HISTORY ----------------
+PAYMENT_FILTERS = ("date_from", "date_to", "class", "subject", "email", "utr")
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_payments(query, args):
+    """Applies the admin payment history filters from the query string."""
+    date_from = _parse_date(args.get("date_from"))
+    date_to = _parse_date(args.get("date_to"))
+
+    if date_from:
+        query = query.filter(Payment.created_at >= date_from)
+    if date_to:
+        # inclusive of the whole "to" day
+        query = query.filter(Payment.created_at < date_to + timedelta(days=1))
+    if args.get("class"):
+        query = query.filter(PaidMaterial.class_name == args["class"])
+    if args.get("subject"):
+        query = query.filter(PaidMaterial.subject == args["subject"])
+    if args.get("email"):
+        query = query.filter(Payment.email == args["email"].strip())
+    if args.get("utr"):
+        query = query.filter(Payment.utr.startswith(args["utr"].strip(), autoescape=True))
+
+    return query
+
+
 @app.route("/admin/payments")
 @admin_required
 def admin_payments():
-    payments = db.session.query(
-        Payment,
-        PaidMaterial
-    ).join(
-        PaidMaterial,
-        Payment.material_id == PaidMaterial.id
-    ).order_by(
-        Payment.created_at.desc()
-    ).all()
+    query = filter_payments(
+        db.session.query(
+            Payment,
+            PaidMaterial
+        ).join(
+            PaidMaterial,
+            Payment.material_id == PaidMaterial.id
+        ),
+        request.args
+    )
+
+    payments = paginate_listing(
+        query,
+        Payment.created_at,
+        Payment.id,
+        row_key=lambda row: (row.Payment.created_at, row.Payment.id)
+    )
+
+    filters = {
+        name: request.args.get(name, "")
+        for name in PAYMENT_FILTERS
+    }
 
     return render_template(
         "admin_payments.html",
-        payments=payments
+        payments=payments,
+        filters=filters,
+        active_filters={k: v for k, v in filters.items() if v},
+        classes=[c[0] for c in db.session.query(PaidMaterial.class_name).distinct()],
+        subjects=[s[0] for s in db.session.query(PaidMaterial.subject).distinct()]
+    )
+
+# ---------------- ADMIN PAYMENT CSV EXPORT ----------------
+@app.route("/admin/payments.csv")
+@admin_required
+def admin_payments_csv():
+    query = filter_payments(
+        db.session.query(
+            Payment.created_at,
+            Payment.email,
+            PaidMaterial.title,
+            PaidMaterial.class_name,
+            PaidMaterial.subject,
+            Payment.amount,
+            Payment.utr
+        ).join(
+            PaidMaterial,
+            Payment.material_id == PaidMaterial.id
+        ),
+        request.args
+    ).order_by(
+        Payment.created_at.desc(),
+        Payment.id.desc()
+    ).yield_per(1000)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow(["Date", "Email", "Material", "Class", "Subject", "Amount", "UTR"])
+
+        # rows come from the database in batches of 1000 and go out
+        # one line at a time; nothing accumulates in memory
+        for row in query:
+            writer.writerow([
+                row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                row.email,
+                row.title,
+                row.class_name,
+                row.subject,
+                row.amount,
+                row.utr
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=payments.csv"}
+    )
+
+# ---------------- ADMIN EMAIL OUTBOX ----------------
+@app.route("/admin/emails")
+@admin_required
+def admin_emails():
+    status = request.args.get("status")
+
+    query = EmailOutbox.query
+    if status:
+        query = query.filter_by(status=status)
+
+    return render_template(
+        "admin_emails.html",
+        counts=outbox_status(),
+        emails=query.order_by(EmailOutbox.id.desc()).limit(100).all(),
+        selected_status=status
     )
 
 # ---------------- NOTICES ----------------
 @app.route("/notices", methods=["GET", "POST"])
+@replica_reads
 def notices():
     if request.method == "POST":
         if session.get("role") != "admin":
             return redirect(url_for("login"))
 
-        pdf = request.files.get("pdf")
-        filename = None
+        # form fields first: a bad form must not leave a stored file behind
+        notice = Notice(
+            title=request.form["title"],
+            content=request.form["content"]
+        )
 
+        pdf = request.files.get("pdf")
         if pdf and pdf.filename:
-            filename = secure_filename(pdf.filename)
-            pdf.save(os.path.join(app.config["NOTICE_FOLDER"], filename))
-
-        db.session.add(
-            Notice(
-                title=request.form["title"],
-                content=request.form["content"],
-                pdf_file=filename
-            )
-        )
+            notice.pdf_file = secure_filename(pdf.filename)
+            notice.pdf_hash = store_upload(pdf)
+
+        db.session.add(notice)
+        bump_content_version(PUBLIC_PAGES)
         db.session.commit()
         return redirect(url_for("notices"))
 
     return render_template(
         "notices.html",
-        notices=Notice.query.order_by(Notice.created_at.desc()).all()
+        notices=paginate_listing(Notice.query, Notice.created_at, Notice.id)
     )
 # ---------------- DOWNLOAD NOTICE PDF ----------------
 @app.route("/notices/pdf/<filename>")
-def download_notice_pdf(filename):
-    return send_from_directory(
+@app.route("/notices/pdf/<digest>/<filename>")
+def download_notice_pdf(filename, digest=None):
+    return send_stored_file(
+        Notice.pdf_hash,
         app.config["NOTICE_FOLDER"],
         filename,
-        as_attachment=True
+        digest
     )
 # ---------------- DELETE NOTICE ----------------
 @app.route("/admin/notices/delete/<int:id>")
@@ -248,14 +589,17 @@ def download_notice_pdf(filename):
 def delete_notice(id):
     notice = Notice.query.get_or_404(id)
 
-    # delete PDF file if exists
-    if notice.pdf_file:
-        pdf_path = os.path.join(app.config["NOTICE_FOLDER"], notice.pdf_file)
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
+    # release the PDF; the file goes once nothing else uses it
+    stale_files = drop_stored_file(
+        app.config["NOTICE_FOLDER"],
+        notice.pdf_file,
+        notice.pdf_hash
+    )
 
     db.session.delete(notice)
+    bump_content_version(PUBLIC_PAGES)
     db.session.commit()
+    remove_unreferenced(stale_files)
 
     flash("Notice deleted successfully")
     return redirect(url_for("notices"))
@@ -263,33 +607,44 @@ def delete_notice(id):
 
 # ---------------- ANNOUNCEMENTS ----------------
 @app.route("/announcements", methods=["GET", "POST"])
+@replica_reads
 def announcements():
     if request.method == "POST":
         if session.get("role") != "admin":
             return redirect(url_for("login"))
 
-        file = request.files.get("file")
-        filename = None
+        announcement = Announcement(
+            title=request.form["title"],
+            content=request.form["content"]
+        )
 
+        file = request.files.get("file")
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config["ANNOUNCEMENT_FOLDER"], filename))
-
-        db.session.add(
-            Announcement(
-                title=request.form["title"],
-                content=request.form["content"],
-                file_name=filename
-            )
-        )
+            announcement.file_name = secure_filename(file.filename)
+            announcement.file_hash = store_upload(file)
+
+        db.session.add(announcement)
+        bump_content_version(PUBLIC_PAGES)
         db.session.commit()
         return redirect(url_for("announcements"))
 
     return render_template(
         "announcements.html",
-        announcements=Announcement.query.order_by(
-            Announcement.created_at.desc()
-        ).all()
+        announcements=paginate_listing(
+            Announcement.query,
+            Announcement.created_at,
+            Announcement.id
+        )
+    )
+# ---------------- DOWNLOAD ANNOUNCEMENT FILE ----------------
+@app.route("/announcements/file/<filename>")
+@app.route("/announcements/file/<digest>/<filename>")
+def download_announcement_file(filename, digest=None):
+    return send_stored_file(
+        Announcement.file_hash,
+        app.config["ANNOUNCEMENT_FOLDER"],
+        filename,
+        digest
     )
 # ---------------- DELETE ANNOUNCEMENT ----------------
 @app.route("/admin/announcement/delete/<int:id>")
@@ -297,23 +652,24 @@ def announcements():
 def delete_announcement(id):
     announcement = Announcement.query.get_or_404(id)
 
-    # delete attached file if exists
-    if announcement.file_name:
-        file_path = os.path.join(
-            app.config["ANNOUNCEMENT_FOLDER"],
-            announcement.file_name
-        )
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    # release the attached file, if any
+    stale_files = drop_stored_file(
+        app.config["ANNOUNCEMENT_FOLDER"],
+        announcement.file_name,
+        announcement.file_hash
+    )
 
     db.session.delete(announcement)
+    bump_content_version(PUBLIC_PAGES)
     db.session.commit()
+    remove_unreferenced(stale_files)
 
     flash("Announcement deleted successfully")
     return redirect(url_for("announcements"))
 
 # ---------------- STUDY MATERIALS ----------------
 @app.route("/materials", methods=["GET", "POST"])
+@replica_reads
 def materials():
     if request.method == "POST":
         if session.get("role") != "admin":
@@ -323,33 +679,35 @@ def materials():
         if not file or not file.filename:
             return redirect(url_for("materials"))
 
-        filename = secure_filename(file.filename)
-        file.save(os.path.join(app.config["STUDY_MATERIAL_FOLDER"], filename))
-
-        db.session.add(
-            StudyMaterial(
-                title=request.form["title"],
-                subject=request.form["subject"],
-                class_name=request.form["class_name"],
-                file_name=filename
-            )
+        material = StudyMaterial(
+            title=request.form["title"],
+            subject=request.form["subject"],
+            class_name=request.form["class_name"],
+            file_name=secure_filename(file.filename)
         )
+        material.file_hash = store_upload(file)
+
+        db.session.add(material)
         db.session.commit()
         return redirect(url_for("materials"))
 
     return render_template(
         "materials.html",
-        materials=StudyMaterial.query.order_by(
-            StudyMaterial.uploaded_at.desc()
-        ).all()
+        materials=paginate_listing(
+            StudyMaterial.query,
+            StudyMaterial.uploaded_at,
+            StudyMaterial.id
+        )
     )
 # ---------------- DOWNLOAD STUDY MATERIAL ----------------
 @app.route("/study-material/<filename>")
-def download_study_material(filename):
-    return send_from_directory(
+@app.route("/study-material/<digest>/<filename>")
+def download_study_material(filename, digest=None):
+    return send_stored_file(
+        StudyMaterial.file_hash,
         app.config["STUDY_MATERIAL_FOLDER"],
         filename,
-        as_attachment=True
+        digest
     )
 # ---------------- DELETE STUDY MATERIAL ----------------
 @app.route("/admin/material/delete/<int:id>")
@@ -357,22 +715,43 @@ def download_study_material(filename):
 def delete_material(id):
     material = StudyMaterial.query.get_or_404(id)
 
-    file_path = os.path.join(
+    stale_files = drop_stored_file(
         app.config["STUDY_MATERIAL_FOLDER"],
-        material.file_name
+        material.file_name,
+        material.file_hash
     )
 
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
     db.session.delete(material)
     db.session.commit()
+    remove_unreferenced(stale_files)
 
     flash("Study material deleted successfully")
     return redirect(url_for("materials"))
 
 
 
+# ---------------- SEARCH ----------------
+@app.route("/search")
+@replica_reads
+def search():
+    query = request.args.get("q", "").strip()
+    page = min(max(request.args.get("page", 1, type=int), 1), MAX_PAGE)
+
+    results = None
+    if query:
+        results = find_documents(
+            query,
+            page=page,
+            per_page=page_size(
+                request.args.get("per_page"),
+                app.config["PAGE_SIZE"],
+                app.config["PAGE_SIZE_MAX"]
+            )
+        )
+
+    return render_template("search.html", query=query, results=results)
+
+
 # ---------------- ADMIN PAID MATERIALS ----------------
 @app.route("/admin/paid-materials", methods=["GET", "POST"])
 @admin_required
@@ -383,20 +762,25 @@ def admin_paid_materials():
             flash("PDF file is required")
             return redirect(url_for("admin_paid_materials"))
 
-        filename = secure_filename(file.filename)
-        file.save(os.path.join(app.config["PAID_MATERIAL_FOLDER"], filename))
+        price = parse_price(request.form.get("price"))
+        if price is None:
+            flash("Price must be a positive number")
+            return redirect(url_for("admin_paid_materials"))
 
-        db.session.add(
-            PaidMaterial(
-                title=request.form["title"],
-                class_name=request.form["class_name"],
-                subject=request.form["subject"],
-                price=float(request.form["price"]),
-                file_name=filename
-            )
+        material = PaidMaterial(
+            title=request.form["title"],
+            class_name=request.form["class_name"],
+            subject=request.form["subject"],
+            price=price,
+            file_name=secure_filename(file.filename)
         )
+        material.file_hash = store_upload(file)
+
+        db.session.add(material)
         db.session.commit()
 
+        prewarm_material_qr(material)
+
         flash("Paid material uploaded successfully")
         return redirect(url_for("admin_paid_materials"))
 
@@ -407,26 +791,139 @@ def admin_paid_materials():
         ).all()
     )
 
+
+def parse_price(value):
+    """A positive, finite price from a form field; None for anything else."""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(price) or price <= 0:
+        return None
+    return price
+
+# ---------------- BULK IMPORT ----------------
+@app.route("/admin/bulk-import", methods=["GET", "POST"])
+@admin_required
+def admin_bulk_import():
+    kind = request.values.get("kind", "study")
+    if kind not in IMPORT_KINDS:
+        abort(404)
+
+    report = None
+    if request.method == "POST":
+        archive = request.files.get("archive")
+        manifest = request.files.get("manifest")
+
+        if not archive or not archive.filename:
+            flash("A ZIP file is required")
+            return redirect(url_for("admin_bulk_import", kind=kind))
+
+        try:
+            report = import_materials(
+                kind,
+                archive.stream,
+                manifest.stream if manifest and manifest.filename else None
+            )
+        except (ValueError, csv.Error) as e:
+            flash(f"Import failed: {e}")
+            return redirect(url_for("admin_bulk_import", kind=kind))
+
+    return render_template("admin_bulk_import.html", kind=kind, report=report)
+
+# ---------------- REPRICE PAID MATERIAL ----------------
+@app.route("/admin/paid-material/price/<int:id>", methods=["POST"])
+@admin_required
+def reprice_paid_material(id):
+    material = PaidMaterial.query.get_or_404(id)
+
+    price = parse_price(request.form.get("price"))
+    if price is None:
+        flash("Price must be a positive number")
+        return redirect(url_for("admin_paid_materials"))
+
+    # the old QR is never requested again
+    evict_material_qr(material)
+    material.price = price
+    db.session.commit()
+
+    prewarm_material_qr(material)
+
+    flash("Price updated successfully")
+    return redirect(url_for("admin_paid_materials"))
+
+# ---------------- METRICS ----------------
+@app.route("/metrics")
+def metrics():
+    token = app.config["METRICS_TOKEN"]
+    authorization = request.headers.get("Authorization", "")
+
+    scraper = token and hmac.compare_digest(authorization, f"Bearer {token}")
+    if not scraper and session.get("role") != "admin":
+        abort(403)
+
+    return Response(
+        render_metrics(app.config["METRICS_DIR"]),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+# ---------------- REQUEST PROFILES ----------------
+@app.route("/admin/profiles")
+@admin_required
+def admin_profiles():
+    return render_template(
+        "admin_profiles.html",
+        profiles=list_profiles(app.config["PROFILE_DIR"])
+    )
+
+
+@app.route("/admin/profiles/<profile_id>")
+@admin_required
+def admin_profile(profile_id):
+    profile = load_profile(app.config["PROFILE_DIR"], profile_id)
+    if profile is None:
+        abort(404)
+    return render_template("admin_profile.html", profile=profile)
+
+
+@app.route("/admin/profiles/<profile_id>.txt")
+@admin_required
+def download_profile(profile_id):
+    profile = load_profile(app.config["PROFILE_DIR"], profile_id)
+    if profile is None:
+        abort(404)
+
+    return Response(
+        collapsed_stacks(profile),
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.txt"}
+    )
+
 # ---------------- DELETE PAID MATERIAL ----------------
 @app.route("/admin/paid-material/delete/<int:id>")
 @admin_required
 def delete_paid_material(id):
     material = PaidMaterial.query.get_or_404(id)
 
-    file_path = os.path.join(
+    stale_files = drop_stored_file(
         app.config["PAID_MATERIAL_FOLDER"],
-        material.file_name
+        material.file_name,
+        material.file_hash
     )
-    if os.path.exists(file_path):
-        os.remove(file_path)
+
+    evict_material_qr(material)
 
     db.session.delete(material)
+    bump_content_version(PAID_FILES)
     db.session.commit()
+    remove_unreferenced(stale_files)
 
     flash("Paid material deleted successfully")
     return redirect(url_for("admin_paid_materials"))
 #----------------faculty list----------------
 @app.route("/faculty")
+@replica_reads
+@cached_page(PUBLIC_PAGES)
 def faculty_public():
     principal = Faculty.query.filter_by(
         is_principal=True,
@@ -452,15 +949,23 @@ def admin_faculty():
         designation = request.form["designation"]
         photo = request.files["photo"]
 
-        filename = secure_filename(photo.filename)
-        photo.save(os.path.join(app.config["FACULTY_FOLDER"], filename))
+        # resized, EXIF-free copies; the upload itself is not kept
+        stem = new_stem(photo.filename)
+        try:
+            widths = make_variants(photo.stream, app.config["FACULTY_FOLDER"], stem)
+        except (OSError, ValueError):
+            flash("Please upload a JPEG, PNG or WebP photo.")
+            return redirect(url_for("admin_faculty"))
 
         faculty = Faculty(
             name=name,
             designation=designation,
-            image=filename
+            image=variant_name(stem, widths[-1], "jpg"),
+            image_stem=stem,
+            image_widths=",".join(map(str, widths))
         )
         db.session.add(faculty)
+        bump_content_version(PUBLIC_PAGES)
         db.session.commit()
 
         flash("Faculty added successfully")
@@ -483,6 +988,7 @@ def make_principal(id):
     faculty = Faculty.query.get_or_404(id)
     faculty.is_principal = True
 
+    bump_content_version(PUBLIC_PAGES)
     db.session.commit()
     flash(f"{faculty.name} is now the Principal")
 
@@ -494,19 +1000,109 @@ def make_principal(id):
 def delete_faculty(id):
     faculty = Faculty.query.get_or_404(id)
 
-    image_path = os.path.join(app.config["FACULTY_FOLDER"], faculty.image)
-    if os.path.exists(image_path):
-        os.remove(image_path)
+    if faculty.image_stem:
+        remove_variants(app.config["FACULTY_FOLDER"], faculty.image_stem, faculty.photo_widths)
+    else:
+        image_path = os.path.join(app.config["FACULTY_FOLDER"], faculty.image)
+        if os.path.exists(image_path):
+            os.remove(image_path)
 
     db.session.delete(faculty)
+    bump_content_version(PUBLIC_PAGES)
     db.session.commit()
 
     flash("Faculty deleted")
     return redirect(url_for("admin_faculty"))
 
+# ---------------- BULK DELETE ----------------
+# listing each kind's checkboxes live on
+BULK_DELETE_PAGES = {
+    "notice": "notices",
+    "announcement": "announcements",
+    "study_material": "materials",
+    "paid_material": "admin_paid_materials",
+    "faculty": "admin_faculty",
+}
+
+
+@app.route("/admin/bulk-delete", methods=["POST"])
+@admin_required
+def bulk_delete():
+    """
+    Deletes many rows in one transaction. Takes form fields named by kind
+    (notice=1&notice=2&faculty=7) or a JSON body {"notice": [1, 2]}.
+    Files are unlinked only after the commit.
+    """
+    payload = request.get_json(silent=True) if request.is_json else None
+    if request.is_json and not isinstance(payload, dict):
+        abort(400)
+
+    selected = {}
+    for kind in DELETABLE:
+        values = payload.get(kind, []) if payload is not None else request.form.getlist(kind)
+        ids = bulk_delete_ids(values)
+        if ids is None:
+            abort(400)
+        if ids:
+            selected[kind] = ids
+
+    batch = BulkDelete()
+    try:
+        for kind, ids in selected.items():
+            batch.delete(kind, ids)
+        if batch.deleted.keys() & {"notice", "announcement", "faculty"}:
+            bump_content_version(PUBLIC_PAGES)
+        if "paid_material" in batch.deleted:
+            bump_content_version(PAID_FILES)
+        db.session.commit()
+    except (SQLAlchemyError, ValueError) as e:
+        # e.g. a paid material with payments where the database enforces
+        # the foreign key: roll back every table, touch no files
+        db.session.rollback()
+        if isinstance(e, ValueError):
+            reason, status = str(e), 400
+        else:
+            reason, status = "the database refused the delete", 409
+        if payload is not None:
+            return jsonify(error=reason, deleted={}), status
+        flash(f"Nothing was deleted: {reason}")
+        return redirect(bulk_delete_page(selected))
+
+    batch.remove_files()
+    for material in batch.deleted.get("paid_material", []):
+        evict_material_qr(material)
+
+    counts = {kind: len(rows) for kind, rows in batch.deleted.items()}
+    if payload is not None:
+        return jsonify(deleted=counts)
+
+    flash(f"Deleted {sum(counts.values())} item(s)")
+    return redirect(bulk_delete_page(selected))
+
+
+def bulk_delete_ids(values):
+    """Ids from a list of ints or digit strings; None for anything else."""
+    if not isinstance(values, list):
+        return None
+    ids = []
+    for value in values:
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            value = int(value)
+        if type(value) is not int:  # bools are ints too
+            return None
+        ids.append(value)
+    return ids
+
+
+def bulk_delete_page(selected):
+    if len(selected) == 1:
+        return url_for(BULK_DELETE_PAGES[next(iter(selected))])
+    return url_for("admin_dashboard")
+
 
 # ---------------- PUBLIC PAID MATERIALS ----------------
 @app.route("/paid-materials")
+@replica_reads
 def paid_materials():
     selected_class = request.args.get("class")
     selected_subject = request.args.get("subject")
@@ -575,22 +1171,9 @@ def payment_page():
     upi_id = os.environ.get("UPI_ID")
     upi_name = os.environ.get("UPI_NAME")
 
-    upi_link = (
-        f"upi://pay?"
-        f"pa={upi_id}"
-        f"&pn={upi_name.replace(' ', '%20')}"
-        f"&am={material.price}"
-        f"&cu=INR"
-        f"&tn=Paid%20Study%20Material"
-    )
-
-    # ---------- QR GENERATION ----------
-    qr_filename = f"upi_qr_{material.id}_{material.price}.png"
-    qr_path = os.path.join(app.config["QR_FOLDER"], qr_filename)
-
-    if not os.path.exists(qr_path):
-        generate_upi_qr(upi_link, qr_path)
+    link = material_upi_link(material)
 
+    # the image itself is rendered (once) by download_qr
     return render_template(
         "payment.html",
         material=material,
@@ -598,8 +1181,8 @@ def payment_page():
         email=email,
         upi_id=upi_id,
         upi_name=upi_name,
-        upi_link=upi_link,
-        qr_image=qr_filename   # ✅ now defined
+        upi_link=link,
+        qr_key=upi_qr_key(link)
     )
 
 # ---------------- SUBMIT PAYMENT ----------------
@@ -618,32 +1201,29 @@ def submit_payment():
         flash("Invalid UTR / Transaction ID.")
         return redirect(url_for("paid_materials"))
 
-    # -------- 🚨 BLOCK REUSED UTR (GLOBAL) --------
-    existing_utr = Payment.query.filter_by(utr=utr.strip()).first()
-    if existing_utr:
-        flash("This UTR / Transaction ID has already been used.")
-        return redirect(url_for("paid_materials"))
-
+    utr = utr.strip()
     material = PaidMaterial.query.get_or_404(material_id)
 
-    # -------- RATE LIMIT (24 HOURS / SAME MATERIAL) --------
-    last_payment = Payment.query.filter_by(
-        email=email,
-        material_id=material.id
-    ).order_by(Payment.created_at.desc()).first()
+    # -------- SAVE PAYMENT (UTR + 24 HOUR CHECKS IN ONE INSERT) --------
+    payment = record_payment(material, email, utr)
+
+    if payment is None:
+        existing = Payment.query.filter_by(utr=utr).first()
+
+        if existing and existing.email == email and existing.material_id == material.id:
+            # double submit of the same payment: it is already recorded and emailed
+            flash("Payment already received! PDF and receipt sent to your Gmail.")
+            return redirect(url_for("home"))
 
-    if last_payment and datetime.utcnow() - last_payment.created_at < timedelta(hours=24):
-        flash("You already purchased this material in the last 24 hours.")
+        if existing:
+            flash("This UTR / Transaction ID has already been used.")
+        else:
+            flash("You already purchased this material in the last 24 hours.")
         return redirect(url_for("paid_materials"))
 
-    # -------- SAVE PAYMENT --------
-    payment = Payment(
-        material_id=material.id,
-        email=email,
-        amount=material.price,
-        utr=utr.strip()
-    )
-    db.session.add(payment)
+    # commit now: the receipt render below must not hold the write lock,
+    # the purchase lock or the payments counter row
+    db.session.expunge(material)  # keeps its loaded fields after the commit
     db.session.commit()
 
     # -------- RECEIPT --------
@@ -652,23 +1232,38 @@ def submit_payment():
         f"receipt_{payment.id}.pdf"
     )
 
-    generate_receipt(
-        receipt_path=receipt_path,
-        school_name=os.environ.get("SCHOOL_NAME", "School"),
-        email=email,
-        material=material,
-        amount=material.price,
-        utr=utr.strip()
-    )
+    from utils.receipt import generate_receipt  # reportlab loads on first use
+
+    try:
+        generate_receipt(
+            receipt_path=receipt_path,
+            school_name=os.environ.get("SCHOOL_NAME", "School"),
+            email=email,
+            material=material,
+            amount=material.price,
+            utr=utr
+        )
+        attachments = [receipt_path]
+    except Exception:
+        # the payment is already recorded; still send the download link
+        app.logger.exception("Receipt for payment %s failed", payment.id)
+        attachments = []
 
     # -------- EMAIL --------
+    download_token = make_download_token(
+        app.config["DOWNLOAD_TOKEN_KEY"],
+        payment.id,
+        material.id,
+        payment.created_at + timedelta(hours=app.config["DOWNLOAD_LINK_HOURS"])
+    )
     download_link = url_for(
         "download_paid_material",
-        token=payment.download_token,
+        token=download_token,
         _external=True
     )
 
-    send_email(
+    # a second, short transaction; the outbox worker sends it in the background
+    enqueue_email(
         to_email=email,
         subject="Your Study Material & Receipt",
         body=f"""
@@ -677,10 +1272,11 @@ Thank you for your payment.
 Download your study material here:
 {download_link}
 
-This link is valid for 24 hours.
+This link is valid for {app.config["DOWNLOAD_LINK_HOURS"]} hours.
 """,
-        attachments=[receipt_path]
+        attachments=attachments
     )
+    db.session.commit()
 
     flash("Payment successful! PDF and receipt sent to your Gmail.")
     return redirect(url_for("home"))
@@ -689,29 +1285,68 @@ This link is valid for 24 hours.
 # ---------------- DOWNLOAD PAID MATERIAL ----------------
 @app.route("/download/<token>")
 def download_paid_material(token):
-    payment = Payment.query.filter_by(download_token=token).first_or_404()
+    if is_signed_token(token):
+        # checked without the database; bots and old links stop here
+        claims = read_download_token(app.config["DOWNLOAD_TOKEN_KEY"], token)
+        if claims is None:
+            abort(404)
+        _, material_id, expired = claims
+
+    elif app.config["LEGACY_DOWNLOAD_TOKENS"]:
+        payment = Payment.query.filter_by(download_token=token).first_or_404()
+        material_id = payment.material_id
+        expired = datetime.utcnow() - payment.created_at > timedelta(
+            hours=app.config["DOWNLOAD_LINK_HOURS"]
+        )
 
-    if datetime.utcnow() - payment.created_at > timedelta(hours=24):
+    else:
+        abort(404)
+
+    if expired:
         flash("Download link expired.")
         return redirect(url_for("home"))
 
-    material = PaidMaterial.query.get(payment.material_id)
+    stored = paid_material_file(material_id)
+    if stored is None:
+        abort(404)
+    file_hash, file_name = stored
+
+    if file_hash:
+        return send_blob(file_hash, file_name, private=True)
 
-    return send_from_directory(
+    return send_upload(
         app.config["PAID_MATERIAL_FOLDER"],
-        material.file_name,
-        as_attachment=True
+        file_name,
+        as_attachment=True,
+        private=True
     )
+
+
+# ---------------- BUILT STATIC ASSETS ----------------
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    return send_precompressed(app.config["ASSET_FOLDER"], filename)
+
+
 # ---------------- SERVE UPI QR IMAGE ----------------
-@app.route("/upi-qr/<filename>")
-def download_qr(filename):
-    return send_from_directory(
-        app.config["QR_FOLDER"],
-        filename
-    )
+@app.route("/upi-qr/<int:material_id>/<key>.png")
+def download_qr(material_id, key):
+    material = PaidMaterial.query.get_or_404(material_id)
+    link = material_upi_link(material)
+
+    # the key is a hash of the link, so a URL's image never changes;
+    # after a reprice the old URL simply stops resolving
+    if upi_qr_key(link) != key:
+        abort(404)
+
+    return send_data(upi_qr_png(link), "image/png", key, immutable=True)
 
 
 # ---------------- RUN ----------------
 if __name__ == "__main__":
+    # local runs set themselves up; servers run `flask --app app bootstrap`
+    with app.app_context():
+        bootstrap_app()
+
     app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
 
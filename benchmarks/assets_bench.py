@@ -0,0 +1,126 @@
+"""
+Bytes transferred per page view, before and after the asset build.
+
+Loads pages through the test client the way a browser would: the HTML,
+then every local stylesheet and script it links, sending
+"Accept-Encoding: gzip, deflate, br". "first" is one view with an empty
+browser cache; "repeat" is the average over a few pages once the cache
+is warm, where fresh responses are not requested again and the rest
+are revalidated with If-None-Match / If-Modified-Since.
+
+    python benchmarks/assets_bench.py
+
+"unbuilt" links the raw files in static/ (no build has run); "built"
+runs build_assets() first. Header bytes are counted as the status line
+plus "Name: value" lines.
+"""
+import gzip
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import scratch_env  # noqa: E402
+
+PAGES = ["/", "/notices", "/materials", "/paid-materials"]
+ACCEPT = {"Accept-Encoding": "gzip, deflate, br"}
+LINKED = re.compile(r'<(?:link[^>]*href|script[^>]*src)="(/[^"]+)"')
+
+
+def header_bytes(response):
+    lines = [f"HTTP/1.1 {response.status}"] + [f"{k}: {v}" for k, v in response.headers.items()]
+    return sum(len(line) + 2 for line in lines) + 2
+
+
+def page_text(response):
+    """The HTML of a page, undoing the gzip / br the app applied."""
+    body = response.data
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        import brotli
+        body = brotli.decompress(body)
+    return body.decode("utf-8")
+
+
+def fresh(response):
+    cache = response.cache_control
+    return bool(cache.max_age) and not cache.no_cache
+
+
+def view(client, path, cache):
+    """(requests, bytes) for one page view; `cache` is the browser cache."""
+    requests = 0
+    transferred = 0
+
+    page = client.get(path, headers=ACCEPT)
+    requests += 1
+    transferred += header_bytes(page) + len(page.data)
+
+    for url in LINKED.findall(page_text(page)):
+        cached = cache.get(url)
+        if cached is not None and fresh(cached):
+            continue
+
+        headers = dict(ACCEPT)
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        response = client.get(url, headers=headers)
+        requests += 1
+        transferred += header_bytes(response) + len(response.data)
+        if response.status_code == 200:
+            cache[url] = response
+
+    return requests, transferred
+
+
+def report(label, visit, requests, transferred):
+    print(f"{label:<8} {visit:<7} {requests:4.1f} requests  {transferred / 1024:6.1f} KB per page view")
+
+
+def main():
+    env = scratch_env("assets-bench-")
+    os.environ.update(env, PAGE_CACHE_ENABLED="0")
+    folder = os.path.dirname(env["UPLOAD_ROOT"])
+
+    from app import app
+    from models.migrations import run_migrations
+    from utils.assets import build_assets, load_manifest
+
+    with app.app_context():
+        run_migrations()
+
+    dist = os.path.join(folder, "dist")
+    app.config["ASSET_FOLDER"] = dist
+
+    for label in ("unbuilt", "built"):
+        if label == "built":
+            build_assets(app.static_folder, dist)
+        else:
+            load_manifest(dist)
+
+        client = app.test_client()
+        cache = {}
+
+        requests, transferred = view(client, PAGES[0], cache)
+        report(label, "first", requests, transferred)
+
+        totals = [view(client, path, cache) for path in PAGES]
+        report(
+            label, "repeat",
+            sum(r for r, _ in totals) / len(PAGES),
+            sum(b for _, b in totals) / len(PAGES)
+        )
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+CPU cost against bytes saved for compressed HTML responses.
+
+Seeds a scratch database (see routes_bench.py), renders the main
+listing pages, and reports for each page:
+
+- raw size, and compressed size / compress time per codec setting
+- request latency through the test client with compression off, on
+  with an empty compressed-body cache, and on with a warm cache
+- the transfer time saved on a slow mobile link (--link-kbps)
+
+    python benchmarks/compression_bench.py [--link-kbps 1600] [--repeat 200]
+
+brotli rows only appear when the brotli package is installed.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import ADMIN_EMAIL, ADMIN_PASSWORD, scratch_env, seed  # noqa: E402
+
+PAGES = {
+    "notices": "/notices",
+    "materials": "/materials",
+    "paid_materials": "/paid-materials",
+    "admin_payments": "/admin/payments",
+}
+
+
+def timed(func, repeat):
+    """Median seconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression benchmark.")
+    parser.add_argument("--database-url", help="scratch database (default: temp SQLite)")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--link-kbps", type=int, default=1600, help="client link speed")
+    args = parser.parse_args()
+
+    env = scratch_env("compression-bench-", args.database_url)
+    os.environ.update(env)
+    os.environ["PAGE_CACHE_ENABLED"] = "0"
+    seed(argparse.Namespace(
+        notices=2000, announcements=500, materials=2000, paid_materials=200, payments=20000
+    ))
+
+    from app import app
+    from utils.compression import brotli, compress, compressed_cache
+
+    codecs = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+    if brotli is not None:
+        codecs += [("br", 4), ("br", 5), ("br", 11)]
+
+    client = app.test_client()
+    client.post("/login", data={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+
+    def transfer_ms(size):
+        return size * 8 / args.link_kbps
+
+    print(f"{'page':<15} {'codec':<8} {'bytes':>8} {'ratio':>6} {'cpu ms':>7} "
+          f"{'saved on link ms':>17}")
+
+    for name, path in PAGES.items():
+        app.config["COMPRESSION_ENABLED"] = False
+        raw = client.get(path).get_data()
+        print(f"{name:<15} {'none':<8} {len(raw):8d} {1:6.2f} {0:7.3f} {0:17.1f}")
+
+        for encoding, level in codecs:
+            seconds = timed(lambda: compress(raw, encoding, level, level), args.repeat)
+            size = len(compress(raw, encoding, level, level))
+            print(f"{'':<15} {f'{encoding}-{level}':<8} {size:8d} {len(raw) / size:6.2f} "
+                  f"{seconds * 1000:7.3f} {transfer_ms(len(raw)) - transfer_ms(size):17.1f}")
+
+        # end to end, with the configured codec setting
+        headers = {"Accept-Encoding": "gzip, br"}
+        off = timed(lambda: client.get(path, headers=headers), args.repeat)
+
+        app.config["COMPRESSION_ENABLED"] = True
+
+        def cold():
+            compressed_cache.clear()
+            return client.get(path, headers=headers)
+
+        cold_seconds = timed(cold, args.repeat)
+        warm_seconds = timed(lambda: client.get(path, headers=headers), args.repeat)
+        sent = client.get(path, headers=headers)
+
+        print(f"{'':<15} request p50: off {off * 1000:.2f} ms, "
+              f"{sent.content_encoding} uncached {cold_seconds * 1000:.2f} ms, "
+              f"cached {warm_seconds * 1000:.2f} ms ({len(sent.data)} bytes sent)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Write throughput of submit_payment-style transactions under N
+concurrent worker processes, per database engine profile.
+
+    python benchmarks/db_concurrency_bench.py [workers] [writes per worker] [readers]
+
+`readers` extra processes page through the payment history for as long
+as the writers run, like admins browsing during a sale. SQLite runs
+against a fresh file for the "none" (driver defaults, rollback journal)
+and "sqlite" (WAL + pragmas) profiles. Set BENCH_POSTGRES_URL to an
+empty scratch database to add the "postgres" profile; its tables are
+dropped afterwards.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = """
+from app import app
+from models import db
+from models.migrations import run_migrations
+from models.paid_material import PaidMaterial
+
+with app.app_context():
+    run_migrations()
+    db.session.add(PaidMaterial(
+        title="Bench", class_name="10", subject="Maths", price=49.0, file_name="bench.pdf"
+    ))
+    db.session.commit()
+"""
+
+TEARDOWN = """
+from sqlalchemy import text
+
+from app import app
+from models import db
+
+with app.app_context():
+    db.drop_all()
+    db.session.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    db.session.commit()
+"""
+
+WRITER = """
+import json, sys, time, uuid
+from sqlalchemy.exc import OperationalError
+
+from app import app
+from models import db
+from models.payment import Payment
+from utils.email_outbox import enqueue_email
+
+writes = int(sys.argv[1])
+ok = errors = 0
+
+with app.app_context():
+    start = time.perf_counter()
+    for _ in range(writes):
+        utr = uuid.uuid4().hex[:12]
+        email = utr + "@example.com"
+        try:
+            # same statements as submit_payment
+            Payment.query.filter_by(email=email, material_id=1).order_by(
+                Payment.created_at.desc()
+            ).first()
+            Payment.query.filter_by(utr=utr).first()
+            db.session.add(Payment(material_id=1, email=email, amount=49.0, utr=utr))
+            db.session.flush()
+            enqueue_email(email, "Receipt", "Thanks")
+            db.session.commit()
+            ok += 1
+        except OperationalError:
+            db.session.rollback()
+            errors += 1
+
+    print(json.dumps({"ok": ok, "errors": errors, "elapsed": time.perf_counter() - start}))
+"""
+
+READER = """
+import json, os, sys, time
+from sqlalchemy.exc import OperationalError
+
+from app import app
+from models import db
+from models.payment import Payment
+
+stop_file = sys.argv[1]
+ok = errors = 0
+
+with app.app_context():
+    start = time.perf_counter()
+    while not os.path.exists(stop_file):
+        try:
+            Payment.query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(20).all()
+            db.session.commit()
+            ok += 1
+        except OperationalError:
+            db.session.rollback()
+            errors += 1
+
+    print(json.dumps({"ok": ok, "errors": errors, "elapsed": time.perf_counter() - start}))
+"""
+
+
+def python(code, env, *args):
+    return subprocess.Popen(
+        [sys.executable, "-c", code, *args],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+
+
+def result(process):
+    return json.loads(process.communicate()[0].strip().splitlines()[-1])
+
+
+def run_profile(profile, url, workers, writes, readers, folder):
+    env = dict(
+        os.environ,
+        DATABASE_URL=url,
+        DB_ENGINE_PROFILE=profile,
+        EMAIL_WORKER_THREAD="0",
+    )
+    if python(SETUP, env).wait():
+        raise SystemExit(f"setup failed for {profile}")
+
+    stop_file = os.path.join(folder, f"stop-{profile}-{time.time()}")
+    reader_processes = [python(READER, env, stop_file) for _ in range(readers)]
+    writer_processes = [python(WRITER, env, str(writes)) for _ in range(workers)]
+
+    written = [result(p) for p in writer_processes]
+    open(stop_file, "w").close()
+    read = [result(p) for p in reader_processes]
+
+    ok = sum(r["ok"] for r in written)
+    errors = sum(r["errors"] for r in written)
+    slowest = max(r["elapsed"] for r in written)
+
+    line = (f"{profile:>9}: {ok / slowest:8.1f} writes/s  "
+            f"({ok} committed, {errors} failed: locked / timeout)")
+    if read:
+        reads = sum(r["ok"] for r in read)
+        read_time = max(r["elapsed"] for r in read)
+        line += f"   {reads / read_time:8.1f} reads/s ({sum(r['errors'] for r in read)} failed)"
+    print(line)
+
+    if url.startswith("postgres"):
+        python(TEARDOWN, env).wait()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    folder = tempfile.mkdtemp()
+
+    print(f"{workers} writers x {writes} writes, {readers} readers")
+
+    for profile in ("none", "sqlite"):
+        url = "sqlite:///" + os.path.join(folder, f"{profile}.db")
+        run_profile(profile, url, workers, writes, readers, folder)
+
+    postgres_url = os.environ.get("BENCH_POSTGRES_URL")
+    if postgres_url:
+        for profile in ("none", "postgres"):
+            run_profile(profile, postgres_url, workers, writes, readers, folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Checks the email outbox against a local SMTP server (aiosmtpd).
+
+Runs the outbox worker's run_once() on a scratch database and asserts:
+
+- send:    queued emails are delivered over one connection and marked sent
+- retry:   a server answering 451 leaves the email pending, with the
+           next attempt pushed back by EMAIL_OUTBOX_RETRY_BASE, doubling
+           per attempt
+- breaker: after EMAIL_BREAKER_THRESHOLD failures the rest of the batch
+           is handed back as pending (not left in 'sending' until the
+           lease runs out), nothing is claimed while the breaker is open,
+           and after the cooldown the next batch goes out and closes it
+
+    python benchmarks/email_outbox_check.py
+
+Exits non-zero on the first failed check.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+from routes_bench import free_port, scratch_env  # noqa: E402
+
+RETRY_BASE = 30
+BREAKER_THRESHOLD = 2
+BREAKER_COOLDOWN = 1
+
+
+class StandInServer:
+    """aiosmtpd handler that accepts or, when `failing`, answers 451."""
+
+    def __init__(self):
+        self.failing = False
+        self.received = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failing:
+            return "451 Try again later"
+        self.received.append(envelope.rcpt_tos[0])
+        return "250 OK"
+
+
+def accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def check(condition, message):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    argparse.ArgumentParser(description="Email outbox check.").parse_args()
+
+    handler = StandInServer()
+    port = free_port()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=port,
+        authenticator=accept_any_login, auth_require_tls=False
+    )
+    controller.start()
+
+    os.environ.update(scratch_env("email-outbox-check-"))
+    os.environ.update({
+        "EMAIL_HOST": "127.0.0.1",
+        "EMAIL_PORT": str(port),
+        "EMAIL_USE_SSL": "0",
+        "EMAIL_USER": "school@example.com",
+        "EMAIL_PASS": "secret",
+    })
+
+    from app import app
+    from models import db
+    from models.email_outbox import EmailOutbox
+    from models.migrations import run_migrations
+    from utils.email_outbox import OutboxWorker, enqueue_email
+
+    app.config.update(
+        EMAIL_OUTBOX_RETRY_BASE=RETRY_BASE,
+        EMAIL_BREAKER_THRESHOLD=BREAKER_THRESHOLD,
+        EMAIL_BREAKER_COOLDOWN=BREAKER_COOLDOWN,
+    )
+
+    def queue(*addresses):
+        with app.app_context():
+            entries = [enqueue_email(address, "Receipt", "Thanks") for address in addresses]
+            db.session.commit()
+            return [entry.id for entry in entries]
+
+    def rows(ids):
+        # a fresh session, as the next batch would see them
+        with app.app_context():
+            return {row.id: row for row in EmailOutbox.query.filter(EmailOutbox.id.in_(ids))}
+
+    def make_due(ids):
+        with app.app_context():
+            EmailOutbox.query.filter(EmailOutbox.id.in_(ids)).update(
+                {"next_attempt_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.session.commit()
+
+    worker = OutboxWorker(app)
+    try:
+        with app.app_context():
+            run_migrations()
+
+        # ---- send
+        ids = queue("a@example.com", "b@example.com", "c@example.com")
+        sent = worker.run_once()
+        check(sent == 3, f"run_once sent {sent} of 3")
+        check(handler.received == ["a@example.com", "b@example.com", "c@example.com"],
+              "the server received every email, in queue order")
+        check(all(row.status == "sent" and row.attempts == 1 for row in rows(ids).values()),
+              "rows marked sent after one attempt")
+
+        # ---- retry with backoff
+        handler.failing = True
+        (retry_id,) = queue("retry@example.com")
+        for attempt in (1, 2):
+            started = datetime.utcnow()
+            worker.run_once()
+            row = rows([retry_id])[retry_id]
+            delay = (row.next_attempt_at - started).total_seconds()
+            expected = RETRY_BASE * 2 ** (attempt - 1)
+            check(row.status == "pending" and row.attempts == attempt,
+                  f"attempt {attempt}: pending again, attempts={row.attempts}")
+            check(expected - 2 <= delay <= expected + 2,
+                  f"attempt {attempt}: next attempt in {delay:.0f}s (expected {expected}s)")
+            make_due([retry_id])
+        with app.app_context():
+            # keep it out of the breaker checks below
+            db.session.delete(db.session.get(EmailOutbox, retry_id))
+            db.session.commit()
+
+        # ---- circuit breaker
+        worker.breaker.record_success()
+        ids = queue(*(f"user{i}@example.com" for i in range(5)))
+        worker.run_once()
+        state = rows(ids)
+        check(worker.breaker.is_open, f"breaker open after {BREAKER_THRESHOLD} failures")
+        check(not any(row.status == "sending" for row in state.values()),
+              "no row left in 'sending' after the breaker opened")
+        handed_back = [row for row in state.values() if row.attempts == 0]
+        check(len(handed_back) == 5 - BREAKER_THRESHOLD and
+              all(row.status == "pending" and row.locked_at is None for row in handed_back),
+              f"{len(handed_back)} unsent rows handed back as pending without using an attempt")
+
+        handler.failing = False
+        make_due(ids)
+        check(worker.run_once() == 0 and not handler.received[3:],
+              "nothing sent while the breaker is open")
+        check(all(row.status == "pending" for row in rows(ids).values()),
+              "nothing claimed while the breaker is open")
+
+        time.sleep(BREAKER_COOLDOWN + 0.1)
+        sent = worker.run_once()
+        check(sent == 5, f"after the cooldown the batch went out ({sent} of 5)")
+        check(not worker.breaker.is_open and worker.breaker.failures == 0,
+              "a successful send closed the breaker")
+    finally:
+        worker.connection.close()
+        controller.stop()
+
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
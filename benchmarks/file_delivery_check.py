@@ -0,0 +1,151 @@
+"""
+Checks both file delivery modes (FILE_DELIVERY) through the download routes.
+
+Serves one blob-store notice PDF and one legacy notice PDF (saved by
+name) from a scratch upload folder, and asserts:
+
+- direct:     200 with ETag, Last-Modified and the file as the body; 304
+              on If-None-Match / If-Modified-Since; 206 with the right
+              bytes and Content-Range on a Range request; 404 for path
+              traversal and unknown files
+- x-accel:    the exact X-Accel-Redirect path under FILE_ACCEL_PREFIX,
+              an empty body and the download name
+- x-sendfile: the exact absolute path in X-Sendfile and an empty body
+
+    python benchmarks/file_delivery_check.py
+
+Exits non-zero on the first failed check.
+"""
+import argparse
+import io
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import scratch_env  # noqa: E402
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 40 + b"\n%%EOF\n"
+LEGACY_NAME = "old notice.pdf"
+
+
+def check(condition, message):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    argparse.ArgumentParser(description="File delivery check.").parse_args()
+
+    os.environ.update(scratch_env("file-delivery-check-"))
+    os.environ["PAGE_CACHE_ENABLED"] = "0"
+
+    from app import app
+    from models import db
+    from models.migrations import run_migrations
+    from models.notice import Notice
+    from utils.blob_store import blob_path
+    from utils.file_delivery import send_upload
+
+    with app.app_context():
+        run_migrations()
+
+    admin = app.test_client()
+    with admin.session_transaction() as session:
+        session["role"] = "admin"
+    admin.post(
+        "/notices",
+        data={"title": "Blob", "content": "c", "pdf": (io.BytesIO(PDF), "term.pdf")},
+        content_type="multipart/form-data"
+    )
+
+    folder = app.config["NOTICE_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, LEGACY_NAME), "wb") as f:
+        f.write(PDF)
+
+    with app.app_context():
+        db.session.add(Notice(title="Legacy", content="c", pdf_file=LEGACY_NAME))
+        db.session.commit()
+        digest = Notice.query.filter_by(title="Blob").one().pdf_hash
+        blob_file = blob_path(digest)
+
+    blob_url = f"/notices/pdf/{digest}/term.pdf"
+    legacy_url = "/notices/pdf/" + LEGACY_NAME.replace(" ", "%20")
+    client = app.test_client()
+
+    def use_mode(mode):
+        app.config["FILE_DELIVERY"] = mode
+        app.config["USE_X_SENDFILE"] = mode == "x-sendfile"
+        print(f"-- {mode}")
+
+    # ---- direct
+    use_mode("direct")
+    for label, url in (("blob", blob_url), ("legacy", legacy_url)):
+        response = client.get(url)
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+        check(response.status_code == 200 and response.data == PDF,
+              f"{label}: 200 with the whole file")
+        check(bool(etag) and bool(modified), f"{label}: ETag {etag} and Last-Modified set")
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        check(response.status_code == 304 and not response.data, f"{label}: 304 on If-None-Match")
+        response = client.get(url, headers={"If-Modified-Since": modified})
+        check(response.status_code == 304, f"{label}: 304 on If-Modified-Since")
+
+        response = client.get(url, headers={"Range": "bytes=100-299"})
+        check(response.status_code == 206 and response.data == PDF[100:300],
+              f"{label}: 206 with bytes 100-299 on a Range request")
+        check(response.headers.get("Content-Range") == f"bytes 100-299/{len(PDF)}",
+              f"{label}: Content-Range {response.headers.get('Content-Range')}")
+
+    check(client.get(blob_url.replace(digest, "0" * len(digest))).status_code == 404,
+          "unknown digest: 404")
+    for url in ("/notices/pdf/..%2F..%2Fapp.py", "/notices/pdf/%2E%2E%2Fconfig.py"):
+        check(client.get(url).status_code == 404, f"traversal {url}: 404")
+
+    with app.test_request_context():
+        for name in ("../../app.py", "../" + os.path.basename(folder) + "/" + LEGACY_NAME):
+            try:
+                send_upload(folder, name)
+                refused = False
+            except Exception as e:
+                refused = getattr(e, "code", None) == 404
+            check(refused, f"send_upload({name!r}): 404")
+
+    # ---- x-accel
+    use_mode("x-accel")
+    prefix = app.config["FILE_ACCEL_PREFIX"].rstrip("/")
+    expected = {
+        blob_url: f"{prefix}/blobs/{digest[:2]}/{digest}",
+        legacy_url: f"{prefix}/notices/old%20notice.pdf",
+    }
+    for url, header in expected.items():
+        response = client.get(url)
+        check(response.status_code == 200 and response.headers.get("X-Accel-Redirect") == header,
+              f"X-Accel-Redirect: {response.headers.get('X-Accel-Redirect')}")
+        check(response.data == b"", "empty body")
+        check("attachment" in response.headers.get("Content-Disposition", ""),
+              "sent as an attachment")
+
+    # ---- x-sendfile
+    use_mode("x-sendfile")
+    expected = {
+        blob_url: os.path.abspath(blob_file),
+        legacy_url: os.path.abspath(os.path.join(folder, LEGACY_NAME)),
+    }
+    for url, header in expected.items():
+        response = client.get(url)
+        check(response.status_code == 200 and response.headers.get("X-Sendfile") == header,
+              f"X-Sendfile: {response.headers.get('X-Sendfile')}")
+        check(response.get_data() == b"", "empty body")
+
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput of the bulk material import (utils/bulk_import.py).
+
+Builds a ZIP of generated PDFs with a manifest, then imports it into a
+scratch database once per batch size and reports files/s and MB/s.
+
+    python benchmarks/import_bench.py [--files 300] [--size-kb 400] [--batch-sizes 1,25,100]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import scratch_env  # noqa: E402
+
+
+def build_archive(path, files, size_kb, seed):
+    rng = random.Random(seed)
+    manifest = io.StringIO()
+    manifest.write("file,title,class,subject,price\n")
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(files):
+            name = f"term/chapter_{i:04d}.pdf"
+            # half random (incompressible), half repetitive, like real PDFs
+            body = rng.randbytes(size_kb * 512) + b"stream BT /F1 12 Tf ET endstream\n" * (size_kb * 16)
+            archive.writestr(name, b"%PDF-1.7\n" + body)
+            manifest.write(f"{name},Chapter {i},10,Maths,49\n")
+        archive.writestr("manifest.csv", manifest.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import throughput benchmark.")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size-kb", type=int, default=400)
+    parser.add_argument("--batch-sizes", default="1,25,100")
+    args = parser.parse_args()
+
+    env = scratch_env("import-bench-")
+    os.environ.update(env)
+    folder = os.path.dirname(env["UPLOAD_ROOT"])
+
+    from app import app
+    from models.migrations import run_migrations
+    from utils.bulk_import import import_materials
+
+    with app.app_context():
+        run_migrations()
+
+    total_mb = args.files * args.size_kb / 1024
+    for run, batch_size in enumerate(int(b) for b in args.batch_sizes.split(",")):
+        # fresh content per run, so the blob store cannot dedupe it
+        path = os.path.join(folder, f"run{run}.zip")
+        build_archive(path, args.files, args.size_kb, seed=run)
+
+        with app.app_context(), open(path, "rb") as archive:
+            report = import_materials("paid", archive, batch_size=batch_size)
+
+        print(f"batch {batch_size:>4}: {report.created} files in {report.seconds:6.2f}s  "
+              f"{report.files_per_second:7.1f} files/s  {total_mb / report.seconds:6.1f} MB/s"
+              + (f"  {len(report.errors)} errors" if report.errors else ""))
+
+
+if __name__ == "__main__":
+    main()
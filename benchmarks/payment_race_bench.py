@@ -0,0 +1,162 @@
+"""
+Concurrent double-submits of the payment form.
+
+Starts gunicorn on a scratch database and fires bursts of simultaneous
+POST /submit-payment requests:
+
+- same:   every client sends the same email, material and UTR (a user
+          double-clicking, or a retrying proxy)
+- stolen: every client sends the same UTR with a different email
+- unique: every client sends its own UTR
+
+It then checks the response codes (any 5xx is a failure) and the rows
+that were written: one payment per UTR, and one queued email per
+payment. It also counts the SQL statements for one accepted and one
+refused submission through the test client.
+
+    python benchmarks/payment_race_bench.py [--bursts 20] [--clients 8] [--workers 4]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import uuid
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import HTTPClient, free_port, scratch_env, wait_for_port  # noqa: E402
+
+
+def seed():
+    from app import app, bootstrap_app
+    from models import db
+    from models.paid_material import PaidMaterial
+
+    with app.app_context():
+        bootstrap_app()
+        db.session.add(PaidMaterial(
+            title="Bench", class_name="10", subject="Maths", price=49.0, file_name="bench.pdf"
+        ))
+        db.session.commit()
+
+
+def burst(port, forms):
+    """Sends every form at the same moment; returns the status codes."""
+    clients = [HTTPClient(port) for _ in forms]
+    ready = threading.Barrier(len(forms))
+    statuses = [None] * len(forms)
+
+    def send(i):
+        ready.wait()
+        statuses[i] = clients[i].send("POST", "/submit-payment", forms[i])
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(forms))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def forms_for(scenario, clients):
+    utr = uuid.uuid4().hex[:12].upper()
+    if scenario == "same":
+        return [{"email": f"buyer-{utr}@gmail.com", "material_id": "1", "utr": utr}] * clients
+    if scenario == "stolen":
+        return [{"email": f"buyer-{utr}-{i}@gmail.com", "material_id": "1", "utr": utr}
+                for i in range(clients)]
+    return [{"email": f"buyer-{utr}-{i}@gmail.com", "material_id": "1", "utr": f"{utr}{i:02d}"}
+            for i in range(clients)]
+
+
+def check_rows(expected_payments):
+    from sqlalchemy import func
+
+    from app import app
+    from models import db
+    from models.email_outbox import EmailOutbox
+    from models.payment import Payment
+
+    with app.app_context():
+        payments = db.session.query(func.count(Payment.id)).scalar()
+        duplicates = db.session.query(Payment.utr).group_by(Payment.utr).having(func.count() > 1).count()
+        emails = db.session.query(func.count(EmailOutbox.id)).scalar()
+
+    print(f"payments {payments} (expected {expected_payments}), "
+          f"duplicate UTRs {duplicates}, queued emails {emails}")
+    return payments == expected_payments and not duplicates and emails == payments
+
+
+def count_queries():
+    from sqlalchemy import event
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    queries = [0]
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_query(*_):
+            queries[0] += 1
+
+    client = app.test_client()
+    utr = uuid.uuid4().hex[:12].upper()
+    form = {"email": f"count-{utr}@gmail.com", "material_id": "1", "utr": utr}
+
+    for label in ("accepted", "refused (double submit)"):
+        queries[0] = 0
+        response = client.post("/submit-payment", data=form)
+        print(f"{label:<24} {response.status_code}  {queries[0]} statements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent payment submission benchmark.")
+    parser.add_argument("--database-url", help="scratch database (default: temp SQLite)")
+    parser.add_argument("--bursts", type=int, default=20, help="bursts per scenario")
+    parser.add_argument("--clients", type=int, default=8, help="simultaneous requests per burst")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    args = parser.parse_args()
+
+    env = scratch_env("payment-race-bench-", args.database_url)
+    os.environ.update(env)
+    seed()
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(args.workers),
+         "--bind", f"127.0.0.1:{port}", "--preload", "--log-level", "warning",
+         "app:create_app()"],
+        cwd=ROOT, env=dict(os.environ, **env)
+    )
+
+    expected = 0
+    failed = False
+    try:
+        wait_for_port(port, server)
+
+        for scenario in ("same", "stolen", "unique"):
+            statuses = Counter()
+            for _ in range(args.bursts):
+                statuses.update(burst(port, forms_for(scenario, args.clients)))
+            expected += args.bursts * (args.clients if scenario == "unique" else 1)
+
+            errors = sum(count for status, count in statuses.items() if status >= 500)
+            failed |= bool(errors)
+            print(f"{scenario:<7} {dict(sorted(statuses.items()))}  5xx: {errors}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    failed |= not check_rows(expected)
+    count_queries()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Receipt microbenchmark.
+
+Compares drawing every receipt from scratch (the old path, still used as
+the fallback) with stamping the cached receipt template.
+
+    python benchmarks/receipt_bench.py [count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from utils.receipt import _draw_fields, _draw_static, generate_receipt
+
+
+class _Material:
+    title = "Class 10 Mathematics - Chapter Notes"
+
+
+def _draw_from_scratch(receipt_path, school_name, email, material, amount, utr):
+    c = canvas.Canvas(receipt_path, pagesize=A4)
+    _draw_static(c, school_name)
+    _draw_fields(c, email, material, amount, utr)
+    c.showPage()
+    c.save()
+
+
+def run(label, render, count, folder):
+    total_bytes = 0
+    start = time.perf_counter()
+
+    for i in range(count):
+        path = os.path.join(folder, f"{label}_{i}.pdf")
+        render(path, "School", f"student{i}@gmail.com", _Material(), 149.0, f"UTR{i:010d}")
+
+    elapsed = time.perf_counter() - start
+
+    for i in range(count):
+        total_bytes += os.path.getsize(os.path.join(folder, f"{label}_{i}.pdf"))
+
+    print(f"{label:<10} {count / elapsed:10.1f} receipts/s {total_bytes / count:10.0f} bytes/receipt")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    with tempfile.TemporaryDirectory() as folder:
+        # build the template outside the timed loop, as a warm worker would
+        generate_receipt(os.path.join(folder, "warmup.pdf"), "School", "a@gmail.com", _Material(), 1.0, "00000000")
+
+        run("before", _draw_from_scratch, count, folder)
+        run("after", generate_receipt, count, folder)
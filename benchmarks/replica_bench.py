@@ -0,0 +1,141 @@
+"""
+Public page latency while payments are being written, with and without a
+read replica.
+
+Seeds a scratch database (see routes_bench.py), then runs gunicorn twice:
+once on the primary alone and once with DATABASE_REPLICA_URLS set. Each
+run has anonymous readers cycling through the public listing pages and
+writers posting /submit-payment, all at the same time. The readers have
+no session, so with a replica they read from it, while the writers stay
+on the primary.
+
+    python benchmarks/replica_bench.py                     # two SQLite files
+    python benchmarks/replica_bench.py --database-url postgresql://.../bench \\
+        --replica-url postgresql://...standby.../bench
+
+For SQLite the replica is a copy of the seeded primary, so it does not
+see the new payments (nothing on the public pages depends on them). A
+Postgres replica must already be streaming from the primary.
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import (  # noqa: E402
+    HTTPClient, free_port, ok, percentile, scratch_env, seed, wait_for_port
+)
+
+PAGES = ["/", "/notices", "/materials", "/paid-materials", "/faculty"]
+
+
+def copy_sqlite(primary_url, replica_path):
+    source = sqlite3.connect(primary_url.removeprefix("sqlite:///"))
+    target = sqlite3.connect(replica_path)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+    return "sqlite:///" + replica_path
+
+
+def run(env, args):
+    """(reader latencies, writer latencies, errors) for one gunicorn run."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(args.workers),
+         "--bind", f"127.0.0.1:{port}", "--preload", "--log-level", "warning",
+         "app:create_app()"],
+        cwd=ROOT, env=dict(os.environ, **env)
+    )
+
+    readers, writers, errors = [], [], [0]
+    lock = threading.Lock()
+    deadline = [0.0]
+
+    def read_loop():
+        client = HTTPClient(port)
+        i = 0
+        while time.perf_counter() < deadline[0]:
+            start = time.perf_counter()
+            status = client.send("GET", PAGES[i % len(PAGES)])
+            with lock:
+                readers.append(time.perf_counter() - start)
+                errors[0] += not ok(status)
+            i += 1
+
+    def write_loop():
+        client = HTTPClient(port)
+        while time.perf_counter() < deadline[0]:
+            utr = uuid.uuid4().hex[:12].upper()
+            form = {"email": f"buyer-{utr}@gmail.com", "material_id": "1", "utr": utr}
+            start = time.perf_counter()
+            status = client.send("POST", "/submit-payment", form)
+            with lock:
+                writers.append(time.perf_counter() - start)
+                errors[0] += not ok(status)
+
+    try:
+        wait_for_port(port, server)
+        deadline[0] = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=read_loop) for _ in range(args.readers)]
+        threads += [threading.Thread(target=write_loop) for _ in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return readers, writers, errors[0]
+
+
+def report(label, readers, writers, errors, seconds):
+    def ms(values, p):
+        return percentile(values, p) * 1000 if values else 0.0
+
+    print(f"{label:<10} reads  p50 {ms(readers, 50):7.2f}  p95 {ms(readers, 95):7.2f} ms "
+          f"{len(readers) / seconds:7.1f} req/s | payments p50 {ms(writers, 50):7.2f}  "
+          f"p95 {ms(writers, 95):7.2f} ms {len(writers) / seconds:6.1f} req/s"
+          + (f" | {errors} errors" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read replica benchmark.")
+    parser.add_argument("--database-url", help="scratch primary (default: temp SQLite)")
+    parser.add_argument("--replica-url", help="replica of --database-url (default: a SQLite copy)")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    args = parser.parse_args()
+
+    env = scratch_env("replica-bench-", args.database_url)
+    env["PAGE_CACHE_ENABLED"] = "0"  # every read reaches the database
+    os.environ.update(env)
+    seed(argparse.Namespace(
+        notices=5000, announcements=2000, materials=5000, paid_materials=500, payments=50_000
+    ))
+
+    replica_url = args.replica_url
+    if replica_url is None:
+        if not env["DATABASE_URL"].startswith("sqlite:///"):
+            raise SystemExit("--replica-url is required for a non-SQLite primary")
+        folder = os.path.dirname(env["UPLOAD_ROOT"])
+        replica_url = copy_sqlite(env["DATABASE_URL"], os.path.join(folder, "replica.db"))
+
+    report("primary", *run(env, args), args.seconds)
+    report("replica", *run(dict(env, DATABASE_REPLICA_URLS=replica_url), args), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
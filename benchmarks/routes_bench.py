@@ -0,0 +1,414 @@
+"""
+Load and latency benchmark for the main public and admin routes.
+
+Seeds a scratch database with a large dataset, then drives each route
+- in-process through the Flask test client (also counts SQL queries per
+  request), and
+- over HTTP against gunicorn, from a pool of concurrent clients.
+
+    python benchmarks/routes_bench.py                       # scratch SQLite
+    python benchmarks/routes_bench.py --payments 300000 --json run.json
+    python benchmarks/routes_bench.py --database-url postgresql://.../bench
+    python benchmarks/routes_bench.py --compare before.json after.json
+
+The database and upload folder must be scratch: the dataset is written
+into them. The outbox sender is off, so submit_payment only queues its
+email and nothing talks to SMTP. Results (p50/p95/p99 ms, requests/s,
+queries/request) print as a table and, with --json, are saved for
+--compare.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ADMIN_EMAIL = "bench-admin@example.com"
+ADMIN_PASSWORD = "bench-password"
+BUYER_EMAIL = "bench-buyer@gmail.com"
+
+ROUTES = [
+    "home", "notices", "materials", "paid_materials", "faculty_public",
+    "payment_page", "submit_payment", "admin_payments",
+]
+
+
+def scratch_env(prefix, database_url=None):
+    """
+    Environment for the app, in this process and in gunicorn: a fresh
+    temp folder (named `prefix`...) for the database, uploads and caches.
+    """
+    folder = tempfile.mkdtemp(prefix=prefix)
+    return {
+        "DATABASE_URL": database_url or "sqlite:///" + os.path.join(folder, "bench.db"),
+        "UPLOAD_ROOT": os.path.join(folder, "uploads"),
+        "JINJA_CACHE_DIR": os.path.join(folder, "jinja_cache"),
+        "METRICS_DIR": os.path.join(folder, "metrics"),
+        "PROFILE_DIR": os.path.join(folder, "profiles"),
+        "EMAIL_WORKER_THREAD": "0",
+        "ADMIN_EMAIL": ADMIN_EMAIL,
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "UPI_ID": "school@upi",
+        "UPI_NAME": "Bench School",
+    }
+
+
+# ---------------- DATASET ----------------
+def seed(args):
+    """Bulk-loads the dataset with Core inserts, then rebuilds derived data."""
+    from app import app, bootstrap_app
+    from models import db
+    from models.announcement import Announcement
+    from models.faculty import Faculty
+    from models.notice import Notice
+    from models.paid_material import PaidMaterial
+    from models.payment import Payment
+    from models.search_index import create_search_index
+    from models.site_counter import recount
+    from models.study_material import StudyMaterial
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    subjects = ["Maths", "Science", "English", "Hindi", "History", "Physics"]
+
+    def ago(limit_days):
+        return now - timedelta(seconds=rng.randint(0, limit_days * 86400))
+
+    def insert(model, count, make):
+        for start in range(0, count, 5000):
+            db.session.execute(
+                model.__table__.insert(),
+                [make(i) for i in range(start, min(start + 5000, count))]
+            )
+        db.session.commit()
+
+    with app.app_context():
+        bootstrap_app()
+
+        insert(Notice, args.notices, lambda i: {
+            "title": f"Notice {i}", "content": "Lorem ipsum " * 40, "created_at": ago(365)
+        })
+        insert(Announcement, args.announcements, lambda i: {
+            "title": f"Announcement {i}", "content": "Dolor sit amet " * 20, "created_at": ago(365)
+        })
+        insert(StudyMaterial, args.materials, lambda i: {
+            "title": f"Material {i}", "subject": rng.choice(subjects),
+            "class_name": str(rng.randint(1, 12)), "file_name": f"material_{i}.pdf",
+            "uploaded_at": ago(365)
+        })
+        insert(PaidMaterial, args.paid_materials, lambda i: {
+            "title": f"Paid material {i}", "subject": rng.choice(subjects),
+            "class_name": str(rng.randint(1, 12)), "description": "Solved papers",
+            "file_name": f"paid_{i}.pdf", "price": rng.choice([49.0, 99.0, 149.0]),
+            "is_active": True, "created_at": ago(365)
+        })
+        insert(Faculty, 30, lambda i: {
+            "name": f"Teacher {i}", "designation": "Teacher", "subject": rng.choice(subjects),
+            "image": "teacher.jpg", "is_active": True, "is_principal": i == 0,
+            "created_at": ago(365)
+        })
+        insert(Payment, args.payments, lambda i: {
+            "material_id": rng.randint(1, args.paid_materials),
+            "email": f"student{rng.randint(1, 20000)}@gmail.com",
+            "amount": 99.0, "utr": f"SEED{i:012d}", "download_token": str(uuid.uuid4()),
+            # older than a day, so the rate limit never trips
+            "created_at": now - timedelta(days=1, seconds=rng.randint(0, 365 * 86400))
+        })
+
+        # Core inserts skip the mapper events that maintain these
+        recount()
+        with db.engine.begin() as conn:
+            create_search_index(conn)
+
+        return db.engine.dialect.name
+
+
+# ---------------- REQUESTS ----------------
+def request_for(route):
+    """(method, path, form) for one request to `route`."""
+    if route == "submit_payment":
+        utr = uuid.uuid4().hex[:12].upper()
+        return "POST", "/submit-payment", {
+            "email": f"buyer-{utr}@gmail.com", "material_id": "1", "utr": utr
+        }
+
+    path = {
+        "home": "/",
+        "notices": "/notices",
+        "materials": "/materials",
+        "paid_materials": "/paid-materials",
+        "faculty_public": "/faculty",
+        "payment_page": "/payment",
+        "admin_payments": "/admin/payments",
+    }[route]
+    return "GET", path, None
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies, wall, errors, queries=None):
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "rps": round(len(latencies) / wall, 1),
+    }
+    if queries is not None:
+        result["queries_per_request"] = round(statistics.mean(queries), 2)
+    return result
+
+
+def ok(status):
+    return 200 <= status < 400
+
+
+def run_test_client(args):
+    """Sequential requests in-process, with per-request SQL counts."""
+    from sqlalchemy import event
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    queries = [0]
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_query(*_):
+            queries[0] += 1
+
+    client = app.test_client()
+    client.post("/login", data={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    client.post("/start-payment", data={"material_id": "1", "email": BUYER_EMAIL})
+
+    results = {}
+    for route in ROUTES:
+        latencies, counts, errors = [], [], 0
+
+        for i in range(args.warmup + args.requests):
+            method, path, form = request_for(route)
+            queries[0] = 0
+
+            start = time.perf_counter()
+            response = client.open(path, method=method, data=form)
+            elapsed = time.perf_counter() - start
+
+            if i >= args.warmup:
+                latencies.append(elapsed)
+                counts.append(queries[0])
+                errors += not ok(response.status_code)
+
+        results[route] = summarize(latencies, sum(latencies), errors, counts)
+        print_row("testclient", route, results[route])
+
+    return results
+
+
+class HTTPClient:
+    """One keep-alive connection plus the session cookie of one user."""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookie = None
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def send(self, method, path, form=None):
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # gunicorn sync workers close idle connections; retry once
+            self.connection.close()
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return response.status
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("gunicorn did not start")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_http(args, env):
+    """Concurrent clients against a gunicorn server."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(args.workers),
+         "--bind", f"127.0.0.1:{port}", "--preload", "--log-level", "warning",
+         "app:create_app()"],
+        cwd=ROOT, env=dict(os.environ, **env)
+    )
+
+    try:
+        wait_for_port(port, server)
+
+        local = threading.local()
+
+        def client():
+            if not hasattr(local, "client"):
+                local.client = HTTPClient(port)
+                local.client.send("POST", "/login", {"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+                local.client.send("POST", "/start-payment", {"material_id": "1", "email": BUYER_EMAIL})
+            return local.client
+
+        def one(route):
+            method, path, form = request_for(route)
+            start = time.perf_counter()
+            status = client().send(method, path, form)
+            return time.perf_counter() - start, status
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for route in ROUTES:
+                list(pool.map(one, [route] * args.warmup))
+
+                start = time.perf_counter()
+                samples = list(pool.map(one, [route] * args.requests))
+                wall = time.perf_counter() - start
+
+                results[route] = summarize(
+                    [latency for latency, _ in samples],
+                    wall,
+                    sum(not ok(status) for _, status in samples)
+                )
+                print_row("http", route, results[route])
+
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+# ---------------- REPORTING ----------------
+def print_row(mode, route, result):
+    queries = result.get("queries_per_request")
+    print(f"{mode:>10} {route:<16} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+          f"p99 {result['p99_ms']:8.2f} ms  {result['rps']:8.1f} req/s"
+          + (f"  {queries:5.1f} queries" if queries is not None else "")
+          + (f"  {result['errors']} errors" if result["errors"] else ""))
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    for mode, routes in after["results"].items():
+        for route, new in routes.items():
+            old = before["results"].get(mode, {}).get(route)
+            if not old:
+                continue
+
+            def change(key):
+                return (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+
+            print(f"{mode:>10} {route:<16} p50 {change('p50_ms'):+6.1f}%  "
+                  f"p95 {change('p95_ms'):+6.1f}%  p99 {change('p99_ms'):+6.1f}%  "
+                  f"req/s {change('rps'):+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route load and latency benchmark.")
+    parser.add_argument("--database-url", help="scratch database (default: temp SQLite)")
+    parser.add_argument("--notices", type=int, default=5000)
+    parser.add_argument("--announcements", type=int, default=2000)
+    parser.add_argument("--materials", type=int, default=5000)
+    parser.add_argument("--paid-materials", type=int, default=500)
+    parser.add_argument("--payments", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mode", choices=["testclient", "http", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--concurrency", type=int, default=16, help="HTTP clients")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    env = scratch_env("routes-bench-", args.database_url)
+    os.environ.update(env)
+
+    start = time.perf_counter()
+    dialect = seed(args)
+    print(f"seeded {dialect} database in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    if args.mode in ("testclient", "both"):
+        results["testclient"] = run_test_client(args)
+    if args.mode in ("http", "both"):
+        results["http"] = run_http(args, env)
+
+    if args.json:
+        report = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+                "database": dialect,
+                "dataset": {
+                    "notices": args.notices,
+                    "announcements": args.announcements,
+                    "materials": args.materials,
+                    "paid_materials": args.paid_materials,
+                    "payments": args.payments,
+                },
+                "requests": args.requests,
+                "workers": args.workers,
+                "concurrency": args.concurrency,
+            },
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Search latency over a large index.
+
+Fills a throwaway database with generated notices (in one transaction,
+through the same sync events as the app) and times /search-style
+queries against it.
+
+    python benchmarks/search_bench.py [documents]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "search.db")
+os.environ["EMAIL_WORKER_THREAD"] = "0"
+
+from sqlalchemy import text
+
+from app import app
+from models import db
+from models.migrations import run_migrations
+from models.notice import Notice
+from models.search_index import find_documents
+
+WORDS = (
+    "exam timetable holiday sports annual function parents meeting fees "
+    "science mathematics physics chemistry biology history geography "
+    "english hindi library uniform transport admission result circular "
+    "practical project assembly competition olympiad scholarship"
+).split()
+
+QUERIES = ["exam", "annual sports", "physics practical", "scholar", "parents meeting fees"]
+
+# school words plus filler, with Zipf-like frequencies as in real text
+VOCABULARY = WORDS + [f"word{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 10) for rank in range(len(VOCABULARY))]
+
+
+def fill(count):
+    rng = random.Random(42)
+    for i in range(count):
+        db.session.add(Notice(
+            title=" ".join(rng.choices(VOCABULARY, WEIGHTS, k=6)),
+            content=" ".join(rng.choices(VOCABULARY, WEIGHTS, k=60)),
+        ))
+        if i % 5000 == 4999:
+            db.session.flush()
+            db.session.expunge_all()
+    db.session.commit()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with app.app_context():
+        run_migrations()
+
+        start = time.perf_counter()
+        fill(count)
+        print(f"indexed {count} documents in {time.perf_counter() - start:.1f}s")
+
+        for query in QUERIES:
+            matches = db.session.execute(
+                text("SELECT COUNT(*) FROM search_fts WHERE search_fts MATCH :match"),
+                {"match": " ".join(f'"{term}"' for term in query.split()) + "*"}
+            ).scalar()
+
+            timings = []
+            for page in (1, 2, 1, 1, 1):
+                start = time.perf_counter()
+                find_documents(query, page=page)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{query!r:>24}: median {statistics.median(timings):6.1f} ms  "
+                  f"max {max(timings):6.1f} ms  ({matches} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Worker startup benchmark: time from `import app` to the first response.
+
+Each run is a fresh interpreter (like a new gunicorn worker) against a
+throwaway SQLite database that is set up once beforehand.
+
+    python benchmarks/startup_bench.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes_bench import scratch_env  # noqa: E402
+
+SETUP = """
+import app as module
+if hasattr(module, "bootstrap_app"):
+    with module.app.app_context():
+        module.bootstrap_app()
+"""
+
+WORKER = """
+import json, time
+start = time.perf_counter()
+
+import app as module
+imported = time.perf_counter()
+
+application = module.create_app() if hasattr(module, "create_app") else module.app
+response = application.test_client().get("/")
+served = time.perf_counter()
+
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import": imported - start, "first_request": served - imported}))
+"""
+
+
+def python(code, env):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    env = dict(os.environ, **scratch_env("startup-bench-"))
+    python(SETUP, env)
+
+    samples = [json.loads(python(WORKER, env)[-1]) for _ in range(runs)]
+
+    for key in ("import", "first_request"):
+        values = [s[key] * 1000 for s in samples]
+        print(f"{key:>14}: median {statistics.median(values):7.1f} ms  "
+              f"min {min(values):7.1f} ms")
+
+    totals = [(s["import"] + s["first_request"]) * 1000 for s in samples]
+    print(f"{'total':>14}: median {statistics.median(totals):7.1f} ms  "
+          f"min {min(totals):7.1f} ms   ({runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,43 @@ import os
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+
+def engine_profile(uri):
+    """DB_ENGINE_PROFILE, with "auto" resolved from the database URI."""
+    profile = os.environ.get("DB_ENGINE_PROFILE", "auto")
+    if profile != "auto":
+        return profile
+    if uri.startswith("sqlite"):
+        return "sqlite"
+    if uri.startswith("postgres"):
+        return "postgres"
+    return "none"
+
+
+def engine_options(profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for an engine profile."""
+
+    if profile == "postgres":
+        statement_timeout = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "15000"))
+        return {
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            # below Render / Supabase idle-connection cutoffs
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": True,
+            "connect_args": {"options": f"-c statement_timeout={statement_timeout}"},
+        }
+
+    if profile == "sqlite":
+        # the PRAGMAs themselves are set on connect (utils/db_engine.py)
+        return {
+            "connect_args": {"timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000},
+        }
+
+    return {}
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
 
@@ -17,3 +54,101 @@ class Config:
         )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # ---------------- DATABASE ENGINE ----------------
+    # auto | postgres | sqlite | none (driver defaults)
+    DB_ENGINE_PROFILE = engine_profile(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(DB_ENGINE_PROFILE)
+
+    # ---------------- READ REPLICAS ----------------
+    # comma-separated; public listing pages read from a random one
+    # (utils/db_routing.py; app.py adds them as binds). Locally, a copy
+    # of the SQLite file works.
+    DATABASE_REPLICA_URLS = [
+        url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
+    # after a POST, that browser session reads from the primary this long
+    REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+
+    # sqlite profile: WAL lets readers run alongside the single writer
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+        "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE_KB", "16000")),  # negative = KiB
+    }
+
+    # ---------------- EMAIL OUTBOX ----------------
+    # run the outbox sender as a thread inside each app process;
+    # set to 0 when running email_worker.py as a separate process
+    EMAIL_WORKER_THREAD = os.environ.get("EMAIL_WORKER_THREAD", "1") == "1"
+    EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get("EMAIL_OUTBOX_POLL_INTERVAL", "2"))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+    EMAIL_OUTBOX_RETRY_BASE = int(os.environ.get("EMAIL_OUTBOX_RETRY_BASE", "30"))
+    EMAIL_OUTBOX_RETRY_CAP = int(os.environ.get("EMAIL_OUTBOX_RETRY_CAP", "3600"))
+    EMAIL_SMTP_IDLE_TIMEOUT = int(os.environ.get("EMAIL_SMTP_IDLE_TIMEOUT", "60"))
+    EMAIL_BREAKER_THRESHOLD = int(os.environ.get("EMAIL_BREAKER_THRESHOLD", "5"))
+    EMAIL_BREAKER_COOLDOWN = int(os.environ.get("EMAIL_BREAKER_COOLDOWN", "60"))
+
+    # ---------------- LISTING PAGINATION ----------------
+    PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "20"))
+    PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "100"))
+
+    # ---------------- PAGE CACHE ----------------
+    PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+    PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", "64"))
+
+    # ---------------- TEMPLATES ----------------
+    # compiled template cache filled by `flask bootstrap`; "" disables it
+    JINJA_CACHE_DIR = os.environ.get(
+        "JINJA_CACHE_DIR", os.path.join(BASE_DIR, "instance", "jinja_cache")
+    )
+
+    # ---------------- METRICS ----------------
+    # per-worker snapshots that /metrics adds up
+    METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(BASE_DIR, "instance", "metrics"))
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+    # lets Prometheus scrape /metrics without an admin session
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+
+    # ---------------- REQUEST PROFILER ----------------
+    # admins profile a request with "X-Profile: 1" or ?profile=1;
+    # PROFILE_SAMPLE_RATE (0-1) also profiles that share of all requests
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "2"))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "instance", "profiles"))
+    PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+
+    # ---------------- UPI QR CACHE ----------------
+    # encoded PNGs kept in memory per worker (a few KB each)
+    QR_CACHE_SIZE = int(os.environ.get("QR_CACHE_SIZE", "256"))
+
+    # ---------------- RESPONSE COMPRESSION ----------------
+    # gzip (or br with the brotli package) for HTML / CSV / JSON responses;
+    # turn off when a proxy in front already compresses
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
+    # compressed bodies kept per worker, so repeated pages skip compressing
+    COMPRESS_CACHE_SIZE = int(os.environ.get("COMPRESS_CACHE_SIZE", "128"))
+
+    # ---------------- PAID DOWNLOAD LINKS ----------------
+    # links are HMAC-signed with this key and expire on their own
+    DOWNLOAD_TOKEN_KEY = os.environ.get("DOWNLOAD_TOKEN_KEY", SECRET_KEY)
+    DOWNLOAD_LINK_HOURS = int(os.environ.get("DOWNLOAD_LINK_HOURS", "24"))
+    # also accept the old per-payment UUID links (a database lookup);
+    # set to 0 once links emailed before the upgrade have expired
+    LEGACY_DOWNLOAD_TOKENS = os.environ.get("LEGACY_DOWNLOAD_TOKENS", "1") == "1"
+    # material id -> file, per worker
+    PAID_FILE_CACHE_SIZE = int(os.environ.get("PAID_FILE_CACHE_SIZE", "512"))
+
+    # ---------------- FILE DELIVERY ----------------
+    # direct | x-accel (nginx) | x-sendfile (apache / lighttpd)
+    FILE_DELIVERY = os.environ.get("FILE_DELIVERY", "direct")
+    FILE_ACCEL_PREFIX = os.environ.get("FILE_ACCEL_PREFIX", "/_protected")
+    FILE_CACHE_MAX_AGE = int(os.environ.get("FILE_CACHE_MAX_AGE", str(365 * 24 * 3600)))
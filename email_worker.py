@@ -0,0 +1,16 @@
+import os
+
+# the standalone worker replaces the in-process sender thread
+os.environ["EMAIL_WORKER_THREAD"] = "0"
+
+from app import app
+from utils.email_outbox import OutboxWorker
+
+if __name__ == "__main__":
+    worker = OutboxWorker(app)
+    print("Email outbox worker started")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+        worker.connection.close()
@@ -0,0 +1,52 @@
+"""
+Imports study or paid materials from a ZIP of PDFs and a CSV manifest
+(utils/bulk_import.py describes the format).
+
+    python import_materials.py study term2.zip
+    python import_materials.py paid papers.zip --manifest papers.csv
+"""
+import argparse
+import csv
+import os
+import sys
+
+# a one-off command does not need the email sender thread
+os.environ["EMAIL_WORKER_THREAD"] = "0"
+
+from app import app
+from models.migrations import run_migrations
+from utils.bulk_import import BATCH_SIZE, KINDS, import_materials
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import of study / paid materials.")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("archive", help="ZIP file of PDFs")
+    parser.add_argument("--manifest", help="CSV manifest (default: manifest.csv in the ZIP)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per commit")
+    args = parser.parse_args()
+
+    with app.app_context():
+        run_migrations()
+
+        with open(args.archive, "rb") as archive:
+            manifest = open(args.manifest, "rb") if args.manifest else None
+            try:
+                report = import_materials(args.kind, archive, manifest, args.batch_size)
+            except (ValueError, csv.Error) as e:
+                sys.exit(f"Import failed: {e}")
+            finally:
+                if manifest:
+                    manifest.close()
+
+    for line, name, message in report.errors:
+        print(f"line {line}: {name or '-'}: {message}")
+
+    print(f"Imported {report.created} files in {report.seconds:.1f}s "
+          f"({report.files_per_second:.1f} files/s), {len(report.errors)} rows skipped")
+    if report.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,5 @@
-from app import app
-from models import db
-from models.notice import Notice
-from models.study_material import StudyMaterial
-from models.user import User
-from models.announcement import Announcement
-from models.paid_material import PaidMaterial
+from app import app, bootstrap_app
+
 with app.app_context():
-    db.create_all()
+    bootstrap_app()
     print("Database created successfully")
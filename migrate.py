@@ -0,0 +1,178 @@
+"""
+Applies pending schema migrations (models/migrations.py).
+
+    python migrate.py            # upgrade
+    python migrate.py --status   # show current version
+    python migrate.py --explain  # print query plans for the hot queries
+    python migrate.py --recount  # rebuild the dashboard counters
+    python migrate.py --import-files  # move old uploads into the blob store
+    python migrate.py --faculty-photos [--jobs N]  # resize old faculty photos
+
+--explain flags any plan step that reads a whole table. On Postgres the
+planner may still pick a sequential scan on tiny tables; check on a
+database with realistic row counts.
+"""
+import argparse
+import os
+import re
+from datetime import datetime, timedelta
+
+# a one-off command does not need the email sender thread
+os.environ["EMAIL_WORKER_THREAD"] = "0"
+
+from sqlalchemy import text
+
+from app import app
+from models import db
+from utils.blob_store import import_legacy_files
+from utils.image_variants import convert_faculty_photos
+from models.announcement import Announcement
+from models.migrations import MIGRATIONS, current_version, run_migrations
+from models.notice import Notice
+from models.paid_material import PaidMaterial
+from models.payment import Payment
+from models.site_counter import recount
+from models.study_material import StudyMaterial
+
+
+def hot_queries():
+    """(label, query) for the queries on the request hot path."""
+    now = datetime.utcnow()
+
+    return [
+        ("submit_payment: last purchase", Payment.query.filter_by(
+            email="student@gmail.com",
+            material_id=1
+        ).order_by(Payment.created_at.desc()).limit(1)),
+
+        ("submit_payment: UTR check", Payment.query.filter_by(
+            utr="123456789012"
+        ).limit(1)),
+
+        ("download_paid_material: token", Payment.query.filter_by(
+            download_token="00000000-0000-0000-0000-000000000000"
+        ).limit(1)),
+
+        ("admin_payments: page", db.session.query(Payment, PaidMaterial).join(
+            PaidMaterial,
+            Payment.material_id == PaidMaterial.id
+        ).order_by(Payment.created_at.desc(), Payment.id.desc()).limit(21)),
+
+        ("admin_payments: date range", db.session.query(Payment, PaidMaterial).join(
+            PaidMaterial,
+            Payment.material_id == PaidMaterial.id
+        ).filter(
+            Payment.created_at >= now - timedelta(days=30)
+        ).order_by(Payment.created_at.desc(), Payment.id.desc()).limit(21)),
+
+        ("paid_materials: filtered", PaidMaterial.query.filter_by(
+            is_active=True,
+            class_name="10",
+            subject="Maths"
+        )),
+
+        ("notices: page", Notice.query.order_by(
+            Notice.created_at.desc(), Notice.id.desc()
+        ).limit(21)),
+
+        ("announcements: page", Announcement.query.order_by(
+            Announcement.created_at.desc(), Announcement.id.desc()
+        ).limit(21)),
+
+        ("materials: page", StudyMaterial.query.order_by(
+            StudyMaterial.uploaded_at.desc(), StudyMaterial.id.desc()
+        ).limit(21)),
+    ]
+
+
+def explain(label, query):
+    """Prints the plan for `query`; returns True if it reads a whole table."""
+    dialect = db.engine.dialect.name
+    statement = query.statement.compile(
+        dialect=db.engine.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    rows = db.session.execute(text(prefix + str(statement))).fetchall()
+
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        lines = [row[-1] for row in rows]
+        full_scan = [
+            line for line in lines
+            if re.match(r"SCAN \w+$", line) or re.match(r"SCAN \w+ \(", line)
+        ]
+    else:
+        lines = [row[0] for row in rows]
+        full_scan = [line for line in lines if "Seq Scan" in line]
+
+    print(f"-- {label} {'[FULL SCAN]' if full_scan else '[ok]'}")
+    for line in lines:
+        print(f"   {line}")
+
+    return bool(full_scan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="show the schema version")
+    parser.add_argument("--explain", action="store_true", help="print plans for hot queries")
+    parser.add_argument("--recount", action="store_true", help="rebuild dashboard counters")
+    parser.add_argument(
+        "--import-files", action="store_true",
+        help="move uploads saved before the blob store into it"
+    )
+    parser.add_argument(
+        "--faculty-photos", action="store_true",
+        help="make resized WebP/JPEG copies of photos uploaded before the resizer"
+    )
+    parser.add_argument("--jobs", type=int, help="processes for --faculty-photos (default: CPUs)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.recount:
+            recount()
+            print("Dashboard counters rebuilt")
+            return
+
+        if args.import_files:
+            run_migrations()
+            converted = import_legacy_files({
+                (Notice, "pdf_file", "pdf_hash"): app.config["NOTICE_FOLDER"],
+                (Announcement, "file_name", "file_hash"): app.config["ANNOUNCEMENT_FOLDER"],
+                (StudyMaterial, "file_name", "file_hash"): app.config["STUDY_MATERIAL_FOLDER"],
+                (PaidMaterial, "file_name", "file_hash"): app.config["PAID_MATERIAL_FOLDER"],
+            })
+            print(f"Moved {converted} uploads into the blob store")
+            return
+
+        if args.faculty_photos:
+            run_migrations()
+            converted, failed = convert_faculty_photos(app.config["FACULTY_FOLDER"], args.jobs)
+            for faculty_id, error in failed.items():
+                print(f"Faculty {faculty_id}: {error}")
+            print(f"Converted {converted} faculty photos ({len(failed)} failed)")
+            if failed:
+                raise SystemExit(1)
+            return
+
+        if args.status:
+            print(f"Schema version {current_version()} (latest {MIGRATIONS[-1][0]})")
+            return
+
+        if args.explain:
+            scans = [label for label, query in hot_queries() if explain(label, query)]
+            if scans:
+                print(f"\n{len(scans)} hot queries read a whole table: {', '.join(scans)}")
+                raise SystemExit(1)
+            print("\nNo full table scans in hot queries")
+            return
+
+        applied = run_migrations(verbose=True)
+        if not applied:
+            print(f"Schema is up to date (version {current_version()})")
+
+
+if __name__ == "__main__":
+    main()
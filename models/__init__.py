@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 
+from utils.db_routing import RoutingSession
 
 
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 from models.faculty import Faculty
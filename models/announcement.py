@@ -7,6 +7,11 @@ class Announcement(db.Model):
     content = db.Column(db.Text, nullable=True) 
 
     file_name = db.Column(db.String(255), nullable=True)  # ✅ FILE NAME
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # blob digest
    
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_announcement_created_id", "created_at", "id"),
+    )
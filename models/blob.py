@@ -0,0 +1,18 @@
+from datetime import datetime
+from models import db
+
+
+class Blob(db.Model):
+    """
+    One stored upload, named by the SHA-256 of its content.
+    ref_count is the number of rows (notices, materials, ...) using it.
+    """
+    __tablename__ = "blobs"
+
+    digest = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Blob {self.digest[:12]} refs={self.ref_count}>"
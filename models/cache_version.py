@@ -0,0 +1,12 @@
+from models import db
+
+
+class CacheVersion(db.Model):
+    """
+    Shared version counter for a group of cached pages.
+    Bumped by admin writes; every worker keys its cache on it.
+    """
+    __tablename__ = "cache_version"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -12,6 +12,10 @@ class Faculty(db.Model):
     subject = db.Column(db.String(120), nullable=True)
 
     image = db.Column(db.String(255), nullable=False)  # image filename
+
+    # resized copies (utils/image_variants.py): <image_stem>-<width>.webp/.jpg
+    image_stem = db.Column(db.String(255), nullable=True)
+    image_widths = db.Column(db.String(50), nullable=True)  # e.g. "240,480,960"
     description = db.Column(db.Text, nullable=True)
 
     is_active = db.Column(db.Boolean, default=True)
@@ -20,5 +24,9 @@ class Faculty(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @property
+    def photo_widths(self):
+        return [int(w) for w in self.image_widths.split(",")] if self.image_widths else []
+
     def __repr__(self):
         return f"<Faculty {self.name}>"
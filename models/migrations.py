@@ -0,0 +1,170 @@
+"""
+Versioned schema migrations.
+
+db.create_all() only creates missing tables, so changes to existing
+tables (indexes, columns) go here. Each migration runs once, in order,
+and is recorded in the schema_migrations table. Statements are written
+to work on both SQLite and Postgres and to be safe to re-run.
+
+Add new migrations to the end of MIGRATIONS; never edit one that has
+shipped.
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+# tables the migrations below write to must exist after create_all()
+from models.blob import Blob
+from models.cache_version import CacheVersion
+from models.search_index import create_search_index
+from models.site_counter import SiteCounter
+
+
+def _create_indexes(conn):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_payment_email_material_created "
+        "ON payment (email, material_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_payment_created_id "
+        "ON payment (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_paid_materials_active_class_subject "
+        "ON paid_materials (is_active, class_name, subject)",
+        "CREATE INDEX IF NOT EXISTS ix_notice_created_id "
+        "ON notice (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_announcement_created_id "
+        "ON announcement (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_study_material_uploaded_id "
+        "ON study_material (uploaded_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_email_outbox_status_next_attempt "
+        "ON email_outbox (status, next_attempt_at)",
+    ]:
+        conn.execute(text(statement))
+
+
+def _seed_cache_version(conn, name):
+    conn.execute(text(
+        "INSERT INTO cache_version (name, version) "
+        "SELECT :name, 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM cache_version WHERE name = :name)"
+    ), {"name": name})
+
+
+def _seed_cache_versions(conn):
+    _seed_cache_version(conn, "public_pages")
+
+
+def _seed_paid_file_version(conn):
+    _seed_cache_version(conn, "paid_files")
+
+
+def _seed_site_counters(conn):
+    for name, table, total in [
+        ("notices", "notice", None),
+        ("announcements", "announcement", None),
+        ("study_materials", "study_material", None),
+        ("paid_materials", "paid_materials", None),
+        ("payments", "payment", "amount"),
+    ]:
+        total_sql = f"COALESCE(SUM({total}), 0)" if total else "0"
+        conn.execute(text("DELETE FROM site_counters WHERE name = :name"), {"name": name})
+        conn.execute(
+            text(
+                f"INSERT INTO site_counters (name, count, total) "
+                f"SELECT :name, COUNT(*), {total_sql} FROM {table}"
+            ),
+            {"name": name}
+        )
+
+
+def _add_blob_hash_columns(conn):
+    for table, column in [
+        ("notice", "pdf_hash"),
+        ("announcement", "file_hash"),
+        ("study_material", "file_hash"),
+        ("paid_materials", "file_hash"),
+    ]:
+        # create_all() already adds the column on a fresh database
+        existing = {c["name"] for c in inspect(conn).get_columns(table)}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(64)"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"
+        ))
+
+
+def _add_faculty_photo_columns(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns("faculty")}
+    for column, size in [("image_stem", 255), ("image_widths", 50)]:
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE faculty ADD COLUMN {column} VARCHAR({size})"))
+
+
+# (version, description, function taking a connection)
+MIGRATIONS = [
+    (1, "hot-path indexes", _create_indexes),
+    (2, "page cache version rows", _seed_cache_versions),
+    (3, "dashboard counters", _seed_site_counters),
+    (4, "content-addressed upload columns", _add_blob_hash_columns),
+    (5, "full-text search index", create_search_index),
+    (6, "faculty photo variants", _add_faculty_photo_columns),
+    (7, "paid file cache version row", _seed_paid_file_version),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def current_version():
+    with db.engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(
+            text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        ).scalar()
+
+
+def run_migrations(verbose=False):
+    """
+    Creates missing tables, then applies pending migrations.
+    Needs an app context. Returns the list of versions applied.
+    """
+
+    db.create_all()
+
+    applied = []
+    version = current_version()
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+
+        try:
+            # one transaction per migration, including its version row
+            with db.engine.begin() as conn:
+                migrate(conn)
+                conn.execute(
+                    text(
+                        "INSERT INTO schema_migrations (version, description, applied_at) "
+                        "VALUES (:version, :description, :applied_at)"
+                    ),
+                    {
+                        "version": number,
+                        "description": description,
+                        "applied_at": datetime.utcnow()
+                    }
+                )
+        except IntegrityError:
+            # another process applied it first
+            continue
+
+        applied.append(number)
+        if verbose:
+            print(f"Applied migration {number}: {description}")
+
+    return applied
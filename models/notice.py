@@ -6,4 +6,9 @@ class Notice(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     pdf_file = db.Column(db.String(300), nullable=True)  # NEW
+    pdf_hash = db.Column(db.String(64), nullable=True, index=True)  # blob digest
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_notice_created_id", "created_at", "id"),
+    )
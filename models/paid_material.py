@@ -12,6 +12,7 @@ class PaidMaterial(db.Model):
     description = db.Column(db.Text, nullable=True)
 
     file_name = db.Column(db.String(255), nullable=False)
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # blob digest
 
     price = db.Column(db.Float, nullable=False)
 
@@ -19,5 +20,10 @@ class PaidMaterial(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # public listing filters
+        db.Index("ix_paid_materials_active_class_subject", "is_active", "class_name", "subject"),
+    )
+
     def __repr__(self):
         return f"<PaidMaterial {self.title}>"
@@ -1,5 +1,9 @@
+import hashlib
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, literal, select, text
+
 from models import db
 
 class Payment(db.Model):
@@ -27,3 +31,81 @@ class Payment(db.Model):
         db.DateTime,
         default=datetime.utcnow
     )
+
+    __table_args__ = (
+        # submit_payment: last purchase of a material by an email
+        db.Index("ix_payment_email_material_created", "email", "material_id", "created_at"),
+        # admin payment history, newest first
+        db.Index("ix_payment_created_id", "created_at", "id"),
+    )
+
+
+# ---------------- RECORDING ----------------
+PURCHASE_INTERVAL = timedelta(hours=24)
+
+
+def _purchase_lock_key(material_id, email):
+    """Signed 64-bit advisory lock key for one email buying one material."""
+    digest = hashlib.blake2b(f"payment:{material_id}:{email}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def record_payment(material, email, utr):
+    """
+    Inserts a payment in one statement, or returns None if it was refused.
+
+    The UTR's unique constraint decides which of two racing submissions
+    wins (ON CONFLICT DO NOTHING, so the loser gets no IntegrityError),
+    and the 24-hour rule is a NOT EXISTS over
+    ix_payment_email_material_created in the same INSERT ... SELECT.
+
+    Under Postgres READ COMMITTED two purchases of one material by one
+    email (different UTRs) could both pass the NOT EXISTS, so an
+    advisory lock on (email, material) serializes them until commit.
+    SQLite runs the statement under its single write lock already.
+    Returns (id, download_token, created_at) of the new row.
+    """
+    from models.site_counter import adjust_counter  # imports this module
+
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": _purchase_lock_key(material.id, email)}
+        )
+
+    table = Payment.__table__
+    now = datetime.utcnow()
+
+    values = select(
+        literal(material.id, table.c.material_id.type),
+        literal(email, table.c.email.type),
+        literal(material.price, table.c.amount.type),
+        literal(utr, table.c.utr.type),
+        literal(str(uuid.uuid4()), table.c.download_token.type),
+        literal(now, table.c.created_at.type),
+    ).where(
+        ~exists().where(
+            table.c.email == email,
+            table.c.material_id == material.id,
+            table.c.created_at > now - PURCHASE_INTERVAL
+        )
+    )
+
+    statement = insert(table).from_select(
+        ["material_id", "email", "amount", "utr", "download_token", "created_at"],
+        values
+    ).on_conflict_do_nothing(
+        index_elements=[table.c.utr]
+    ).returning(table.c.id, table.c.download_token, table.c.created_at)
+
+    row = connection.execute(statement).first()
+    if row is not None:
+        # Core inserts skip the counter's mapper events
+        adjust_counter("payments", 1, material.price)
+    return row
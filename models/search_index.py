@@ -0,0 +1,236 @@
+"""
+Full-text search over notices, announcements and study materials.
+
+One index holds every searchable row as (kind, doc_id, title, body):
+
+- SQLite: an FTS5 table, ranked with bm25(). The rowid encodes
+  (kind, doc_id), so updates and deletes are rowid lookups.
+- Postgres: the search_documents table with a weighted tsvector
+  column and a GIN index, ranked with ts_rank_cd().
+
+Mapper events keep it in sync on every insert, update and delete, in
+the same transaction as the write. The tables are created (and back-
+filled) by migrations.
+"""
+import re
+from collections import namedtuple
+
+from sqlalchemy import event, text
+
+from models import db
+from models.announcement import Announcement
+from models.notice import Notice
+from models.paid_material import PaidMaterial
+from models.study_material import StudyMaterial
+
+SearchKind = namedtuple("SearchKind", "code model table title body active")
+
+# kind -> how its rows are indexed; `code` is part of the SQLite rowid
+SEARCHABLE = {
+    "notice": SearchKind(0, Notice, "notice", "title", ["content"], None),
+    "announcement": SearchKind(1, Announcement, "announcement", "title", ["content"], None),
+    "study_material": SearchKind(
+        2, StudyMaterial, "study_material", "title", ["subject", "class_name"], None
+    ),
+    "paid_material": SearchKind(
+        3, PaidMaterial, "paid_materials", "title", ["description"], "is_active"
+    ),
+}
+KIND_CODES = 8
+
+# longest query we bother to parse, and deepest page served
+MAX_TERMS = 8
+MAX_PAGE = 50
+
+# ranking scores every match, so a word found in most documents would
+# cost ~1ms per thousand; such queries rank only their newest matches
+MAX_CANDIDATES = 2000
+
+
+def _rowid(kind, doc_id):
+    return doc_id * KIND_CODES + SEARCHABLE[kind].code
+
+
+# ---------------- WRITING ----------------
+def index_document(connection, kind, doc_id, title, body):
+    """Adds or replaces one row in the index."""
+    remove_documents(connection, kind, [doc_id])
+
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            text(
+                "INSERT INTO search_fts (rowid, kind, doc_id, title, body) "
+                "VALUES (:rowid, :kind, :doc_id, :title, :body)"
+            ),
+            {"rowid": _rowid(kind, doc_id), "kind": kind, "doc_id": doc_id,
+             "title": title, "body": body}
+        )
+    else:
+        connection.execute(
+            text(
+                "INSERT INTO search_documents (kind, doc_id, title, body) "
+                "VALUES (:kind, :doc_id, :title, :body)"
+            ),
+            {"kind": kind, "doc_id": doc_id, "title": title, "body": body}
+        )
+
+
+def remove_documents(connection, kind, doc_ids):
+    """Drops rows from the index (also for bulk deletes that skip events)."""
+    if not doc_ids:
+        return
+
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            text("DELETE FROM search_fts WHERE rowid = :rowid"),
+            [{"rowid": _rowid(kind, doc_id)} for doc_id in doc_ids]
+        )
+    else:
+        connection.execute(
+            text("DELETE FROM search_documents WHERE kind = :kind AND doc_id = :doc_id"),
+            [{"kind": kind, "doc_id": doc_id} for doc_id in doc_ids]
+        )
+
+
+def _document(spec, target):
+    """(title, body) for a model instance, or None if it isn't searchable."""
+    if spec.active and not getattr(target, spec.active):
+        return None
+
+    body = " ".join(getattr(target, column) or "" for column in spec.body)
+    return getattr(target, spec.title), body
+
+
+def _register(kind, spec):
+    def sync(mapper, connection, target):
+        document = _document(spec, target)
+        if document is None:
+            remove_documents(connection, kind, [target.id])
+        else:
+            index_document(connection, kind, target.id, *document)
+
+    @event.listens_for(spec.model, "after_delete")
+    def after_delete(mapper, connection, target):
+        remove_documents(connection, kind, [target.id])
+
+    event.listen(spec.model, "after_insert", sync)
+    event.listen(spec.model, "after_update", sync)
+
+
+for _kind, _spec in SEARCHABLE.items():
+    _register(_kind, _spec)
+
+
+# ---------------- SCHEMA ----------------
+def create_search_index(conn):
+    """Creates the dialect's index table and fills it from existing rows."""
+
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DROP TABLE IF EXISTS search_fts"))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE search_fts USING fts5("
+            "kind UNINDEXED, doc_id UNINDEXED, title, body, "
+            "tokenize = 'porter unicode61')"
+        ))
+    else:
+        conn.execute(text("DROP TABLE IF EXISTS search_documents"))
+        conn.execute(text(
+            "CREATE TABLE search_documents ("
+            "kind VARCHAR(20) NOT NULL, "
+            "doc_id INTEGER NOT NULL, "
+            "title TEXT NOT NULL, "
+            "body TEXT NOT NULL, "
+            "tsv TSVECTOR GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', body), 'B')) STORED, "
+            "PRIMARY KEY (kind, doc_id))"
+        ))
+        conn.execute(text(
+            "CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)"
+        ))
+
+    for kind, spec in SEARCHABLE.items():
+        body = " || ' ' || ".join(f"COALESCE({column}, '')" for column in spec.body)
+        where = f" WHERE {spec.active} = :active" if spec.active else ""
+
+        if conn.dialect.name == "sqlite":
+            statement = (
+                f"INSERT INTO search_fts (rowid, kind, doc_id, title, body) "
+                f"SELECT id * {KIND_CODES} + {spec.code}, :kind, id, title, {body} "
+                f"FROM {spec.table}{where}"
+            )
+        else:
+            statement = (
+                f"INSERT INTO search_documents (kind, doc_id, title, body) "
+                f"SELECT :kind, id, title, {body} FROM {spec.table}{where}"
+            )
+
+        conn.execute(text(statement), {"kind": kind, "active": True})
+
+
+# ---------------- QUERYING ----------------
+SearchResult = namedtuple("SearchResult", "kind doc_id title body")
+
+
+class SearchPage:
+    """One page of ranked results."""
+
+    def __init__(self, items, page, has_next):
+        self.items = items
+        self.page = page
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _terms(query):
+    """Words of a user query; operators and quotes are never passed on."""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def find_documents(query, page=1, per_page=20):
+    """
+    Ranked matches for every word in `query`; the last word also matches
+    as a prefix, so partial words find results. Returns a SearchPage.
+    """
+
+    terms = _terms(query)
+    if not terms:
+        return SearchPage([], page, False)
+
+    params = {
+        "limit": per_page + 1,
+        "offset": (page - 1) * per_page,
+        "candidates": MAX_CANDIDATES,
+    }
+
+    if db.engine.dialect.name == "sqlite":
+        params["match"] = " ".join(f'"{term}"' for term in terms) + "*"
+        statement = text(
+            "SELECT kind, doc_id, title, body FROM search_fts "
+            "WHERE search_fts MATCH :match "
+            # newest candidates: rowid ranges are cheap for FTS5
+            "AND rowid >= COALESCE(("
+            "SELECT rowid FROM search_fts WHERE search_fts MATCH :match "
+            "ORDER BY rowid DESC LIMIT 1 OFFSET :candidates - 1), 0) "
+            # weights: kind, doc_id, title, body
+            "ORDER BY bm25(search_fts, 0, 0, 10.0, 1.0) "
+            "LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["tsquery"] = " & ".join(terms) + ":*"
+        statement = text(
+            "SELECT kind, doc_id, title, body FROM ("
+            "SELECT kind, doc_id, title, body, tsv FROM search_documents "
+            "WHERE tsv @@ to_tsquery('english', :tsquery) "
+            "ORDER BY doc_id DESC LIMIT :candidates) AS candidates "
+            "ORDER BY ts_rank_cd(tsv, to_tsquery('english', :tsquery)) DESC, doc_id DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+
+    rows = [SearchResult(*row) for row in db.session.execute(statement, params)]
+    return SearchPage(rows[:per_page], page, len(rows) > per_page)
@@ -0,0 +1,97 @@
+from sqlalchemy import event, func
+
+from models import db
+from models.announcement import Announcement
+from models.notice import Notice
+from models.paid_material import PaidMaterial
+from models.payment import Payment
+from models.study_material import StudyMaterial
+
+
+class SiteCounter(db.Model):
+    """
+    Row counts (and payment revenue) kept up to date on every insert and
+    delete, so the admin dashboard never runs COUNT(*) over big tables.
+    """
+    __tablename__ = "site_counters"
+
+    name = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)  # payments: revenue
+
+
+# counter name -> (model, column summed into `total` or None)
+COUNTED_MODELS = {
+    "notices": (Notice, None),
+    "announcements": (Announcement, None),
+    "study_materials": (StudyMaterial, None),
+    "paid_materials": (PaidMaterial, None),
+    "payments": (Payment, Payment.amount),
+}
+
+
+def _adjust(connection, name, count, total):
+    """Applies a delta in the flush's own transaction."""
+    table = SiteCounter.__table__
+
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(
+            count=table.c.count + count,
+            total=table.c.total + total
+        )
+    ).rowcount
+
+    if not updated:
+        # counters are seeded by migrations; cover an unmigrated db
+        connection.execute(table.insert().values(name=name, count=count, total=total))
+
+
+def _register(name, model, total_column):
+    def amount(target):
+        return (getattr(target, total_column.key) or 0) if total_column is not None else 0
+
+    @event.listens_for(model, "after_insert")
+    def after_insert(mapper, connection, target):
+        _adjust(connection, name, 1, amount(target))
+
+    @event.listens_for(model, "after_delete")
+    def after_delete(mapper, connection, target):
+        _adjust(connection, name, -1, -amount(target))
+
+
+for _name, (_model, _total_column) in COUNTED_MODELS.items():
+    _register(_name, _model, _total_column)
+
+
+def adjust_counter(name, count, total=0):
+    """
+    For bulk statements that bypass ORM events (Query.delete(), Core
+    inserts): apply the delta in the current session's transaction.
+    """
+    _adjust(db.session.connection(), name, count, total)
+
+
+def read_counters():
+    """All counters in one query, as {name: SiteCounter-like row}."""
+    rows = {row.name: row for row in SiteCounter.query.all()}
+    return {
+        name: rows.get(name) or SiteCounter(name=name, count=0, total=0)
+        for name in COUNTED_MODELS
+    }
+
+
+def recount():
+    """Rebuilds every counter from the real tables (one full scan each)."""
+    for name, (model, total_column) in COUNTED_MODELS.items():
+        columns = [func.count()]
+        if total_column is not None:
+            columns.append(func.coalesce(func.sum(total_column), 0))
+
+        row = db.session.query(*columns).select_from(model).one()
+
+        counter = db.session.get(SiteCounter, name) or SiteCounter(name=name)
+        counter.count = row[0]
+        counter.total = float(row[1]) if total_column is not None else 0
+        db.session.add(counter)
+
+    db.session.commit()
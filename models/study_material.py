@@ -9,4 +9,9 @@ class StudyMaterial(db.Model):
     subject = db.Column(db.String(100), nullable=False)
     class_name = db.Column(db.String(50), nullable=False)
     file_name = db.Column(db.String(300), nullable=False)
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # blob digest
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_study_material_uploaded_id", "uploaded_at", "id"),
+    )
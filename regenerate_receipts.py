@@ -0,0 +1,136 @@
+"""
+Rewrites uploads/receipts/receipt_<id>.pdf for every payment.
+
+Run after changing the school name, logo or receipt layout:
+
+    python regenerate_receipts.py [--workers N] [--chunk-size N] [--force]
+
+Payments are read in id order, one chunk at a time, and rendered on a
+process pool. Receipts already drawn with the current layout are skipped
+unless --force is given.
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from types import SimpleNamespace
+
+# a one-off command does not need the email sender thread
+os.environ["EMAIL_WORKER_THREAD"] = "0"
+
+from app import app
+from models import db
+from models.payment import Payment
+from models.paid_material import PaidMaterial
+from utils.receipt import generate_receipt, receipt_is_current
+
+
+def iter_payment_chunks(chunk_size):
+    """Yields lists of payment rows, keyset-paginated on Payment.id."""
+    last_id = 0
+
+    while True:
+        rows = db.session.query(
+            Payment.id,
+            Payment.email,
+            Payment.amount,
+            Payment.utr,
+            Payment.created_at,
+            PaidMaterial.title
+        ).join(
+            PaidMaterial,
+            Payment.material_id == PaidMaterial.id
+        ).filter(
+            Payment.id > last_id
+        ).order_by(
+            Payment.id
+        ).limit(chunk_size).all()
+
+        if not rows:
+            return
+
+        last_id = rows[-1].id
+        yield [tuple(row) for row in rows]
+
+
+def render_receipt(job):
+    """Pool worker: returns 'written', 'skipped' or an error message."""
+    receipt_folder, school_name, force, row = job
+    payment_id, email, amount, utr, created_at, title = row
+
+    receipt_path = os.path.join(receipt_folder, f"receipt_{payment_id}.pdf")
+
+    if not force and receipt_is_current(receipt_path, school_name):
+        return "skipped"
+
+    try:
+        # write next to the old file and swap, so a half-written
+        # receipt is never attached to an email
+        tmp_path = receipt_path + ".tmp"
+        generate_receipt(
+            receipt_path=tmp_path,
+            school_name=school_name,
+            email=email,
+            material=SimpleNamespace(title=title),
+            amount=amount,
+            utr=utr,
+            issued_at=created_at
+        )
+        os.replace(tmp_path, receipt_path)
+    except Exception as e:
+        return f"payment {payment_id}: {e}"
+
+    return "written"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate payment receipts.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--force", action="store_true",
+                        help="rewrite receipts even if they are up to date")
+    args = parser.parse_args()
+
+    receipt_folder = app.config["RECEIPT_FOLDER"]
+    school_name = os.environ.get("SCHOOL_NAME", "School")
+
+    # workers only render PDFs; make sure none of them inherits
+    # a pooled database connection
+    with app.app_context():
+        db.engine.dispose()
+
+    with Pool(processes=args.workers) as pool, app.app_context():
+        total = Payment.query.count()
+        counts = {"written": 0, "skipped": 0, "failed": 0}
+        done = 0
+        start = time.perf_counter()
+
+        print(f"Regenerating receipts for {total} payments with {args.workers} workers")
+
+        for chunk in iter_payment_chunks(args.chunk_size):
+            jobs = [(receipt_folder, school_name, args.force, row) for row in chunk]
+
+            for result in pool.imap_unordered(render_receipt, jobs, chunksize=32):
+                if result in counts:
+                    counts[result] += 1
+                else:
+                    counts["failed"] += 1
+                    print(f"[RECEIPT ERROR] {result}")
+
+            done += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{done}/{total} "
+                f"written={counts['written']} skipped={counts['skipped']} failed={counts['failed']} "
+                f"({done / elapsed:.1f} payments/s)"
+            )
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Done in {elapsed:.1f}s: "
+            f"{counts['written']} written, {counts['skipped']} up to date, {counts['failed']} failed"
+        )
+
+
+if __name__ == "__main__":
+    main()
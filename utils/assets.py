@@ -0,0 +1,107 @@
+"""
+Build step for the site's CSS and JS.
+
+build_assets() minifies each file in ASSETS and writes it to the dist
+folder under a content-hashed name (css/style.3f2a9c1e0b.css), plus .gz
+and, when the brotli package is installed, .br siblings. manifest.json
+maps each source path to its built name; templates link through
+asset_url(), which falls back to the plain static file until a build
+has run. Because a built file's name changes with its content, it is
+served as immutable.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import current_app, url_for
+
+ASSETS = ["css/style.css", "js/main.js"]
+MANIFEST = "manifest.json"
+
+# source name -> built name; read on first use
+_manifest = None
+
+
+# ---------------- MINIFYING ----------------
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    # spaces matter between selectors and inside values like calc(),
+    # but never next to these
+    text = re.sub(r" ?([{};,>]) ?", r"\1", text)
+    text = re.sub(r": ", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Drops comments, indentation and blank lines; keeps line breaks for ASI."""
+    text = re.sub(r"^\s*/\*.*?\*/", "", text, flags=re.S | re.M)
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ---------------- BUILDING ----------------
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def build_assets(static_folder, dist_folder):
+    """Builds every asset; returns the new manifest."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    manifest = {}
+    for name in ASSETS:
+        root, ext = os.path.splitext(name)
+        with open(os.path.join(static_folder, name), encoding="utf-8") as f:
+            data = MINIFIERS[ext](f.read()).encode()
+
+        built = f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        path = os.path.join(dist_folder, built)
+        _write(path, data)
+
+        # mtime=0 keeps rebuilds byte-identical
+        _write(path + ".gz", gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            _write(path + ".br", brotli.compress(data, quality=11))
+
+        manifest[name] = built
+
+    # older builds stay, for pages still open from the previous deploy
+    _write(os.path.join(dist_folder, MANIFEST), json.dumps(manifest, indent=2).encode())
+
+    global _manifest
+    _manifest = manifest
+    return manifest
+
+
+# ---------------- LINKING ----------------
+def load_manifest(dist_folder):
+    global _manifest
+    try:
+        with open(os.path.join(dist_folder, MANIFEST)) as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    return _manifest
+
+
+def asset_url(name):
+    """URL of the built copy of a static file, or of the file itself."""
+    if _manifest is None:
+        load_manifest(current_app.config["ASSET_FOLDER"])
+
+    built = _manifest.get(name)
+    if built is None:
+        return url_for("static", filename=name)
+    return url_for("asset", filename=built)
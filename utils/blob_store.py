@@ -0,0 +1,253 @@
+"""
+Content-addressed storage for uploads.
+
+Each upload is hashed while it streams to disk and stored once under
+uploads/blobs/<first two hex digits>/<sha256>. Rows keep the digest in
+their *_hash column (the original file name stays for display and
+downloads) and the blobs table counts how many rows use each file.
+A file is removed only after the transaction that dropped its last
+reference has committed.
+
+Adding a reference and removing an unreferenced file both lock the
+digest first (_lock_digests), so an upload of the same content cannot
+rely on a file that a concurrent delete is about to unlink.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db
+from models.blob import Blob
+
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_path(digest):
+    return os.path.join(current_app.config["BLOB_FOLDER"], digest[:2], digest)
+
+
+def _insert(connection):
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _lock_digests(connection, digests):
+    """
+    Holds off other reference changes and file removals for `digests`
+    until the current transaction ends: transaction-level advisory locks
+    on Postgres; on SQLite any write takes the database's write lock.
+    """
+    if connection.dialect.name == "postgresql":
+        # sorted, so two lockers of the same digests cannot deadlock
+        for digest in sorted(digests):
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"),
+                {"key": int(digest[:15], 16)}
+            )
+    else:
+        table = Blob.__table__
+        connection.execute(
+            table.update().where(table.c.digest.in_(list(digests))).values(
+                ref_count=table.c.ref_count
+            )
+        )
+
+
+def _add_reference(digest, size):
+    """Locks the digest and adds one reference (an upsert, so two first uploads don't clash)."""
+    table = Blob.__table__
+    connection = db.session.connection()
+
+    _lock_digests(connection, [digest])
+    insert = _insert(connection)
+    connection.execute(
+        insert(table).values(digest=digest, size=size, ref_count=1).on_conflict_do_update(
+            index_elements=[table.c.digest],
+            set_={"ref_count": table.c.ref_count + 1}
+        )
+    )
+
+
+def store_stream(stream):
+    """
+    Writes a binary stream into the store and adds one reference to it.
+    Returns the hex digest. The caller commits.
+    """
+
+    folder = current_app.config["BLOB_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+
+    # temp file in the store itself, so the final rename is atomic
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+
+        hex_digest = digest.hexdigest()
+        final_path = blob_path(hex_digest)
+
+        # the reference (and its lock) first: from here on no delete can
+        # unlink final_path until this transaction has ended
+        _add_reference(hex_digest, size)
+
+        if os.path.exists(final_path):
+            # already stored: keep the existing copy
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return hex_digest
+
+
+def store_upload(file_storage):
+    """store_stream() for a werkzeug FileStorage from request.files."""
+    return store_stream(file_storage.stream)
+
+
+def release_blob(digest):
+    """
+    Drops one reference. Returns the file path to unlink once the
+    caller has committed, or None while other rows still use the blob.
+    """
+
+    if not digest:
+        return None
+
+    table = Blob.__table__
+    connection = db.session.connection()
+
+    connection.execute(
+        table.update().where(table.c.digest == digest).values(
+            ref_count=table.c.ref_count - 1
+        )
+    )
+    deleted = connection.execute(
+        table.delete().where(table.c.digest == digest, table.c.ref_count <= 0)
+    ).rowcount
+
+    return blob_path(digest) if deleted else None
+
+
+def release_blobs(digests):
+    """
+    release_blob() for many rows at once: one UPDATE per distinct
+    reference count dropped, then one DELETE. Returns the file paths to
+    unlink after the caller has committed.
+    """
+
+    drops = Counter(digest for digest in digests if digest)
+    if not drops:
+        return []
+
+    table = Blob.__table__
+    connection = db.session.connection()
+
+    by_amount = {}
+    for digest, amount in drops.items():
+        by_amount.setdefault(amount, []).append(digest)
+
+    for amount, group in by_amount.items():
+        connection.execute(
+            table.update().where(table.c.digest.in_(group)).values(
+                ref_count=table.c.ref_count - amount
+            )
+        )
+
+    unused = connection.execute(
+        table.delete().where(
+            table.c.digest.in_(list(drops)), table.c.ref_count <= 0
+        ).returning(table.c.digest)
+    ).scalars().all()
+
+    return [blob_path(digest) for digest in unused]
+
+
+def remove_unreferenced(paths):
+    """
+    Unlinks blob files once the caller has committed. Runs its own short
+    transaction: the digests are locked and checked again, so a file is
+    kept if an upload has referenced the same content in the meantime.
+    If the check fails, the files are left (an unused file is harmless).
+    """
+
+    digests = sorted({os.path.basename(path) for path in paths if path})
+    if not digests:
+        return
+
+    table = Blob.__table__
+    try:
+        connection = db.session.connection()
+        _lock_digests(connection, digests)
+        used = set(connection.execute(
+            select(table.c.digest).where(table.c.digest.in_(digests))
+        ).scalars())
+
+        for digest in digests:
+            if digest in used:
+                continue
+            try:
+                os.remove(blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+        db.session.commit()  # releases the locks
+    except SQLAlchemyError:
+        db.session.rollback()
+
+
+def import_legacy_files(folders):
+    """
+    Moves files uploaded before the blob store existed into it and fills
+    in the *_hash columns. `folders` maps (model, name column, hash
+    column) to the folder the old files live in. Commits per row.
+    Returns the number of rows converted.
+    """
+
+    converted = 0
+
+    for (model, name_column, hash_column), folder in folders.items():
+        imported = set()
+        rows = model.query.filter(
+            getattr(model, hash_column).is_(None),
+            getattr(model, name_column).isnot(None)
+        ).all()
+
+        for row in rows:
+            path = os.path.join(folder, getattr(row, name_column))
+            if not os.path.isfile(path):
+                continue
+
+            # rows sharing a legacy file each get their own reference
+            with open(path, "rb") as f:
+                setattr(row, hash_column, store_stream(f))
+            db.session.commit()
+
+            imported.add(path)
+            converted += 1
+
+        for path in imported:
+            os.remove(path)
+
+    return converted
@@ -0,0 +1,124 @@
+"""
+Set-based deletion of many notices, announcements, materials or faculty
+members at once.
+
+BulkDelete.delete() runs, per table, one SELECT for the rows' files and
+one DELETE ... WHERE id IN (...), and keeps the derived data in step
+inside the same transaction: blob reference counts, dashboard counters
+and the search index (a bulk DELETE skips the mapper events that
+normally do this). Nothing on disk is touched until the caller has
+committed and calls remove_files(); if the commit fails, every row and
+file is still there.
+"""
+import os
+from collections import namedtuple
+
+from flask import current_app
+
+from models import db
+from models.announcement import Announcement
+from models.faculty import Faculty
+from models.notice import Notice
+from models.paid_material import PaidMaterial
+from models.search_index import remove_documents
+from models.site_counter import adjust_counter
+from models.study_material import StudyMaterial
+from utils.blob_store import release_blobs, remove_unreferenced
+from utils.image_variants import remove_variants
+
+Deletable = namedtuple("Deletable", "model name_column hash_column folder counter search_kind")
+
+# kind -> how its rows and files are removed
+DELETABLE = {
+    "notice": Deletable(Notice, "pdf_file", "pdf_hash", "NOTICE_FOLDER", "notices", "notice"),
+    "announcement": Deletable(
+        Announcement, "file_name", "file_hash", "ANNOUNCEMENT_FOLDER", "announcements", "announcement"
+    ),
+    "study_material": Deletable(
+        StudyMaterial, "file_name", "file_hash", "STUDY_MATERIAL_FOLDER", "study_materials", "study_material"
+    ),
+    "paid_material": Deletable(
+        PaidMaterial, "file_name", "file_hash", "PAID_MATERIAL_FOLDER", "paid_materials", "paid_material"
+    ),
+    "faculty": Deletable(Faculty, "image", None, "FACULTY_FOLDER", None, None),
+}
+
+# most ids accepted per kind in one request
+MAX_IDS = 1000
+
+
+class BulkDelete:
+    """Deletes rows now; their files once remove_files() is called."""
+
+    def __init__(self):
+        self.deleted = {}  # kind -> deleted rows (model instances, detached)
+        self._blob_paths = []
+        self._legacy_files = []
+        self._variants = []
+
+    def delete(self, kind, ids):
+        """Deletes the rows of `kind` with these ids; returns the ones found."""
+        spec = DELETABLE[kind]
+        model = spec.model
+        ids = sorted(set(ids))
+        if len(ids) > MAX_IDS:
+            raise ValueError(f"at most {MAX_IDS} {kind} ids per request")
+        if not ids:
+            return []
+
+        rows = model.query.filter(model.id.in_(ids)).all()
+        if not rows:
+            return []
+        found = [row.id for row in rows]
+
+        # rows leave the session: the bulk DELETE below replaces
+        # session.delete(), and the routes only read these afterwards
+        for row in rows:
+            db.session.expunge(row)
+
+        folder = current_app.config[spec.folder]
+        legacy_names = set()
+
+        for row in rows:
+            if spec.hash_column and getattr(row, spec.hash_column):
+                continue  # released below
+            if kind == "faculty" and row.image_stem:
+                self._variants.append((folder, row.image_stem, row.photo_widths))
+            elif getattr(row, spec.name_column):
+                legacy_names.add(getattr(row, spec.name_column))
+
+        if spec.hash_column:
+            self._blob_paths += release_blobs([getattr(row, spec.hash_column) for row in rows])
+
+        model.query.filter(model.id.in_(found)).delete(synchronize_session=False)
+
+        # a legacy file (saved by name) can be shared with rows that stay
+        if legacy_names:
+            name_column = getattr(model, spec.name_column)
+            still_used = {
+                name for (name,) in db.session.query(name_column).filter(name_column.in_(legacy_names))
+            }
+            self._legacy_files += [
+                os.path.join(folder, name) for name in legacy_names - still_used
+            ]
+
+        if spec.counter:
+            adjust_counter(spec.counter, -len(found))
+        if spec.search_kind:
+            remove_documents(db.session.connection(), spec.search_kind, found)
+
+        self.deleted[kind] = rows
+        return rows
+
+    def remove_files(self):
+        """Unlinks the deleted rows' files. Call only after the commit."""
+        remove_unreferenced(self._blob_paths)
+
+        for path in self._legacy_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        for folder, stem, widths in self._variants:
+            remove_variants(folder, stem, widths)
@@ -0,0 +1,207 @@
+"""
+Bulk import of study / paid materials from a ZIP of PDFs and a CSV.
+
+The manifest has one row per file:
+
+    file,title,class,subject,price,description
+    maths/ch1.pdf,Chapter 1 notes,10,Maths,49,
+
+`file` is the entry's path inside the ZIP (a bare file name also works
+if it is unique); price is required for paid materials only and
+description is optional. The CSV can be uploaded on its own or stored
+in the archive as manifest.csv.
+
+Entries are streamed one at a time from the archive into the blob
+store, so nothing is extracted in full in memory. Rows are committed in
+batches; a bad row is reported with its CSV line and skipped, and a
+batch that fails to commit is rolled back and reported as a whole.
+"""
+import csv
+import io
+import os
+import time
+import zipfile
+
+from werkzeug.utils import secure_filename
+
+from models import db
+from models.paid_material import PaidMaterial
+from models.study_material import StudyMaterial
+from utils.blob_store import blob_path, remove_unreferenced, store_stream
+
+MANIFEST_NAME = "manifest.csv"
+MAX_ENTRY_BYTES = 200 * 1024 * 1024
+BATCH_SIZE = 25
+
+KINDS = {"study": StudyMaterial, "paid": PaidMaterial}
+
+# other header spellings accepted in the manifest
+COLUMN_ALIASES = {"class_name": "class", "file_name": "file", "filename": "file"}
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is shown to the admin."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (csv line, file, message)
+        self.seconds = 0.0
+
+    def fail(self, line, name, message):
+        self.errors.append((line, name, message))
+
+    @property
+    def files_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+class _CheckedEntry:
+    """Reads a ZIP entry, refusing non-PDFs and oversized (or lying) entries."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        if self.size == 0 and not chunk.startswith(b"%PDF-"):
+            raise RowError("not a PDF file")
+        self.size += len(chunk)
+        if self.size > MAX_ENTRY_BYTES:
+            raise RowError(f"larger than {MAX_ENTRY_BYTES // (1024 * 1024)} MB")
+        return chunk
+
+
+def _read_manifest(archive, manifest):
+    if manifest is None:
+        try:
+            manifest = archive.open(MANIFEST_NAME)
+        except KeyError:
+            raise ValueError(f"no CSV manifest given and no {MANIFEST_NAME} in the ZIP")
+
+    reader = csv.DictReader(io.TextIOWrapper(manifest, encoding="utf-8-sig", newline=""))
+    rows = []
+    for row in reader:
+        # header names are matched loosely: "Class", " class ", "class_name"
+        fields = {}
+        for column, value in row.items():
+            if column is None:
+                continue  # cells beyond the header
+            column = column.strip().lower()
+            fields[COLUMN_ALIASES.get(column, column)] = (value or "").strip()
+        rows.append((reader.line_num, fields))
+    return rows
+
+
+def _find_entry(archive, by_name, name):
+    try:
+        return archive.getinfo(name)
+    except KeyError:
+        pass
+
+    matches = by_name.get(os.path.basename(name), [])
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        raise RowError("file name is in several folders of the ZIP; give its full path")
+    raise RowError("file is not in the ZIP")
+
+
+def _material(kind, row, file_name, digest):
+    fields = dict(
+        title=row["title"],
+        class_name=row["class"],
+        subject=row["subject"],
+        file_name=file_name,
+        file_hash=digest,
+    )
+    if kind == "paid":
+        fields.update(price=float(row["price"]), description=row.get("description") or None)
+    return KINDS[kind](**fields)
+
+
+def _validate(kind, row):
+    missing = [column for column in ("file", "title", "class", "subject") if not row.get(column)]
+    if kind == "paid" and not row.get("price"):
+        missing.append("price")
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+
+    if kind == "paid":
+        try:
+            price = float(row["price"])
+        except ValueError:
+            raise RowError(f"price {row['price']!r} is not a number")
+        if price <= 0:
+            raise RowError("price must be more than 0")
+
+
+def import_materials(kind, archive_file, manifest_file=None, batch_size=BATCH_SIZE):
+    """
+    Imports every manifest row of `archive_file` (a seekable binary file)
+    as a `kind` ("study" or "paid") material. Needs an app context.
+    Returns an ImportReport.
+    """
+
+    report = ImportReport()
+    started = time.perf_counter()
+
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile:
+        raise ValueError("the upload is not a ZIP file")
+
+    with archive:
+        by_name = {}
+        for info in archive.infolist():
+            if not info.is_dir():
+                by_name.setdefault(os.path.basename(info.filename), []).append(info)
+
+        # read (and decode) the whole manifest before writing anything
+        rows = _read_manifest(archive, manifest_file)
+        batch = []  # (line, file, digest)
+
+        def commit_batch():
+            try:
+                db.session.commit()
+                report.created += len(batch)
+            except Exception as e:
+                db.session.rollback()
+                for line, name, _ in batch:
+                    report.fail(line, name, f"not saved: {e.__class__.__name__}")
+                # the rolled-back references no longer keep these files
+                remove_unreferenced([blob_path(digest) for _, _, digest in batch])
+            batch.clear()
+
+        for line, row in rows:
+            name = row.get("file", "")
+            try:
+                _validate(kind, row)
+                info = _find_entry(archive, by_name, name)
+                if info.file_size > MAX_ENTRY_BYTES:
+                    raise RowError(f"larger than {MAX_ENTRY_BYTES // (1024 * 1024)} MB")
+
+                with archive.open(info) as entry:
+                    digest = store_stream(_CheckedEntry(entry))
+            except RowError as e:
+                report.fail(line, name, str(e))
+                continue
+            except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                # corrupt or encrypted entry
+                report.fail(line, name, f"cannot read from the ZIP: {e}")
+                continue
+
+            file_name = secure_filename(os.path.basename(info.filename)) or "material.pdf"
+            db.session.add(_material(kind, row, file_name, digest))
+            batch.append((line, name, digest))
+
+            if len(batch) >= batch_size:
+                commit_batch()
+
+        if batch:
+            commit_batch()
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,95 @@
+"""
+gzip / brotli compression of dynamic responses.
+
+An after_request hook compresses text responses (HTML, CSV, JSON, ...)
+for clients that accept it, picking br over gzip when the brotli
+package is installed. Files are left alone: send_file() responses are
+streamed, and PDFs and images are compressed already.
+
+Compressed bodies of GET responses are kept in a small per-worker LRU
+keyed by (encoding, hash of the body), so a page served again with the
+same bytes (cached pages, unchanged listings) is not recompressed.
+"""
+import gzip
+import hashlib
+
+from flask import request
+
+from utils.page_cache import PageCache
+
+COMPRESSIBLE = {
+    "text/html", "text/css", "text/plain", "text/csv", "text/xml",
+    "application/json", "application/javascript", "application/xml",
+    "image/svg+xml",
+}
+
+# bodies larger than this are compressed but not cached
+MAX_CACHED_BODY = 512 * 1024
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressed_cache = PageCache()
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, gzip_level, mtime=0)
+
+
+def _should_compress(response, min_size):
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return False
+    if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE:
+        return False
+    # conditional requests compare ETags against the plain body
+    if "ETag" in response.headers:
+        return False
+    return response.content_length is not None and response.content_length >= min_size
+
+
+def init_compression(app):
+    """Compresses eligible responses of `app`."""
+
+    compressed_cache.max_entries = app.config["COMPRESS_CACHE_SIZE"]
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config["COMPRESSION_ENABLED"]:
+            return response
+
+        if response.mimetype in COMPRESSIBLE:
+            response.vary.add("Accept-Encoding")
+        if not _should_compress(response, app.config["COMPRESS_MIN_SIZE"]):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        cacheable = (
+            request.method == "GET"
+            and not response.cache_control.no_store
+            and len(data) <= MAX_CACHED_BODY
+        )
+
+        key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+        body = compressed_cache.get(key) if cacheable else None
+        if body is None:
+            body = compress(
+                data,
+                encoding,
+                app.config["COMPRESS_LEVEL"],
+                app.config["COMPRESS_BROTLI_QUALITY"]
+            )
+            if cacheable:
+                compressed_cache.set(key, body)
+
+        response.set_data(body)
+        response.content_encoding = encoding
+        return response
@@ -0,0 +1,18 @@
+from sqlalchemy import event
+
+
+def configure_engine(engine, config):
+    """
+    Per-connection setup for the selected DB_ENGINE_PROFILE. Pool sizes
+    and timeouts are plain engine options (config.engine_options).
+    """
+
+    if config["DB_ENGINE_PROFILE"] == "sqlite" and engine.dialect.name == "sqlite":
+        pragmas = config["SQLITE_PRAGMAS"]
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
@@ -0,0 +1,90 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS adds each replica as a Flask-SQLAlchemy bind
+(replica0, replica1, ...). Views marked @replica_reads pick one replica
+per GET request and send their SELECTs to it; everything else (writes,
+SELECT ... FOR UPDATE, raw connections, admin requests, CLI commands and
+the email worker) stays on the primary. Once a request writes, its later
+reads go to the primary too.
+
+Read-your-writes: admins always read from the primary, and a browser
+session that has just sent a POST reads from the primary for
+REPLICA_STICKY_SECONDS, so a page shown after a write never comes from a
+replica that has not caught up yet.
+"""
+import random
+import time
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select, TextClause
+
+REPLICA_PREFIX = "replica"
+SAFE_METHODS = {"GET", "HEAD"}
+
+
+def replica_binds(urls, options_for):
+    """SQLALCHEMY_BINDS entries for replica URLs; options_for(url) -> engine options."""
+    return {f"{REPLICA_PREFIX}{i}": {"url": url, **options_for(url)} for i, url in enumerate(urls)}
+
+
+def _is_read(clause):
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith("SELECT")
+    return False
+
+
+class RoutingSession(Session):
+    """Sends reads to session.info["replica"] (a bind key) when set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None and bind is None:
+            if not self._flushing and _is_read(clause):
+                return self._db.engines[replica]
+            # this request writes: read its own rows from the primary
+            self.info.pop("replica")
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_names(app):
+    return [key for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith(REPLICA_PREFIX)]
+
+
+def _wants_primary():
+    if session.get("role") == "admin":
+        return True
+    return session.get("primary_until", 0) > time.time()
+
+
+def replica_reads(view):
+    """
+    Lets a view's GET requests read from a replica. Goes above
+    @cached_page, so the page and its content version come from the
+    same database.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from models import db
+
+        replicas = replica_names(current_app)
+        if replicas and request.method in SAFE_METHODS and not _wants_primary():
+            db.session.info["replica"] = random.choice(replicas)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_replica_routing(app):
+    """Pins a browser session to the primary for a while after it writes."""
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method not in SAFE_METHODS and replica_names(app):
+            session["primary_until"] = time.time() + app.config["REPLICA_STICKY_SECONDS"]
+        return response
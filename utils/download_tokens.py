@@ -0,0 +1,48 @@
+"""
+Signed, self-expiring download links for paid materials.
+
+A token is "<payment id>.<material id>.<expires>.<signature>", where
+expires is a unix time and the signature is an HMAC-SHA256 of the rest
+under DOWNLOAD_TOKEN_KEY. Forged, mangled and expired tokens are
+rejected without touching the database.
+"""
+import base64
+import calendar
+import hashlib
+import hmac
+import time
+
+SIGNATURE_BYTES = 16
+
+
+def _signature(key, payload):
+    digest = hmac.new(key.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).rstrip(b"=").decode()
+
+
+def make_download_token(key, payment_id, material_id, expires):
+    """Token for one payment's file, valid until `expires` (a datetime, UTC)."""
+    expires = calendar.timegm(expires.utctimetuple())
+    payload = f"{payment_id}.{material_id}.{expires}"
+    return f"{payload}.{_signature(key, payload)}"
+
+
+def is_signed_token(token):
+    # legacy tokens are UUIDs, which never contain a dot
+    return "." in token
+
+
+def read_download_token(key, token):
+    """
+    (payment_id, material_id, expired) for a genuine token, else None.
+    """
+    payload, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(_signature(key, payload), signature):
+        return None
+
+    try:
+        payment_id, material_id, expires = (int(part) for part in payload.split("."))
+    except ValueError:
+        return None
+
+    return payment_id, material_id, time.time() > expires
@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import db
+from models.email_outbox import EmailOutbox
+
+
+def enqueue_email(to_email, subject, body, attachments=None):
+    """
+    Adds an email to the outbox in the current session.
+    The caller commits, so the email is stored atomically with its payment.
+    """
+
+    entry = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        attachments=json.dumps(list(attachments or [])),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(entry)
+    return entry
+
+
+def outbox_status():
+    """Returns {status: count} for the outbox."""
+    rows = db.session.query(
+        EmailOutbox.status,
+        func.count(EmailOutbox.id)
+    ).group_by(EmailOutbox.status).all()
+
+    counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+class CircuitBreaker:
+    """
+    Stops talking to the SMTP server after `threshold` consecutive
+    failures, then lets one attempt through every `cooldown` seconds.
+    """
+
+    def __init__(self, threshold=5, cooldown=60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        if self.opened_at is None:
+            return False
+        # half-open once the cooldown has passed
+        return time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+def _retry_delay(attempts, base, cap):
+    return timedelta(seconds=min(cap, base * (2 ** (attempts - 1))))
+
+
+def _claim_batch(batch_size, lease_seconds):
+    """
+    Marks up to `batch_size` due emails as 'sending' and returns them.
+    The conditional UPDATE makes sure two workers never claim the same row.
+    """
+
+    now = datetime.utcnow()
+
+    # rows left in 'sending' by a crashed worker go back to the queue
+    EmailOutbox.query.filter(
+        EmailOutbox.status == "sending",
+        EmailOutbox.locked_at < now - timedelta(seconds=lease_seconds)
+    ).update({"status": "pending"}, synchronize_session=False)
+
+    due_ids = [
+        row.id for row in db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.id).limit(batch_size)
+    ]
+
+    claimed = []
+    for entry_id in due_ids:
+        updated = EmailOutbox.query.filter_by(
+            id=entry_id,
+            status="pending"
+        ).update(
+            {"status": "sending", "locked_at": now},
+            synchronize_session=False
+        )
+        if updated:
+            claimed.append(entry_id)
+
+    db.session.commit()
+
+    if not claimed:
+        return []
+
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(claimed)
+    ).order_by(EmailOutbox.id).all()
+
+
+def process_outbox_batch(connection, breaker, config):
+    """
+    Sends one batch of due emails over `connection`.
+    Returns the number of emails sent.
+    """
+
+    # smtplib / email.mime are only loaded by processes that send
+    import smtplib
+    from utils.email_service import build_message
+
+    if breaker.is_open:
+        return 0
+
+    batch = _claim_batch(
+        config["EMAIL_OUTBOX_BATCH_SIZE"],
+        config["EMAIL_OUTBOX_LEASE_SECONDS"]
+    )
+    sent = 0
+
+    for index, entry in enumerate(batch):
+        if breaker.is_open:
+            # give the rest of the batch back without using up attempts
+            for pending in batch[index:]:
+                pending.status = "pending"
+                pending.locked_at = None
+            # the caller removes the session, which would roll this back
+            db.session.commit()
+            break
+
+        try:
+            msg = build_message(
+                connection.from_email,
+                entry.to_email,
+                entry.subject,
+                entry.body,
+                entry.attachment_paths
+            )
+            connection.send(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            # bad address: retrying will not help
+            entry.status = "failed"
+            entry.attempts += 1
+            entry.last_error = str(e)
+            entry.locked_at = None
+        except Exception as e:
+            connection.close()
+            breaker.record_failure()
+
+            entry.attempts += 1
+            entry.last_error = str(e)
+            entry.locked_at = None
+            if entry.attempts >= config["EMAIL_OUTBOX_MAX_ATTEMPTS"]:
+                entry.status = "failed"
+            else:
+                entry.status = "pending"
+                entry.next_attempt_at = datetime.utcnow() + _retry_delay(
+                    entry.attempts,
+                    config["EMAIL_OUTBOX_RETRY_BASE"],
+                    config["EMAIL_OUTBOX_RETRY_CAP"]
+                )
+        else:
+            breaker.record_success()
+            entry.status = "sent"
+            entry.attempts += 1
+            entry.last_error = None
+            entry.locked_at = None
+            entry.sent_at = datetime.utcnow()
+            sent += 1
+
+        # commit per message so a crash never re-sends delivered mail
+        db.session.commit()
+
+    return sent
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Background sender for the email outbox.
+    Polls for due emails and sends them over one reused SMTP connection.
+    """
+
+    def __init__(self, app):
+        from utils.email_service import SMTPConnection
+
+        super().__init__(name="email-outbox", daemon=True)
+        self.app = app
+        self.connection = SMTPConnection(
+            idle_timeout=app.config["EMAIL_SMTP_IDLE_TIMEOUT"]
+        )
+        self.breaker = CircuitBreaker(
+            threshold=app.config["EMAIL_BREAKER_THRESHOLD"],
+            cooldown=app.config["EMAIL_BREAKER_COOLDOWN"]
+        )
+        self._stop_event = threading.Event()
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                return process_outbox_batch(
+                    self.connection, self.breaker, self.app.config
+                )
+            except Exception as e:
+                db.session.rollback()
+                print(f"[EMAIL OUTBOX] Batch failed: {e}")
+                return 0
+            finally:
+                db.session.remove()
+
+    def run(self):
+        interval = self.app.config["EMAIL_OUTBOX_POLL_INTERVAL"]
+
+        while not self._stop_event.is_set():
+            sent = self.run_once()
+            if not sent:
+                self._stop_event.wait(interval)
+
+        self.connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def start_outbox_worker(app):
+    """
+    Starts this process's sender thread, once. Threads do not survive a
+    fork, so a worker forked from a preloaded master starts its own.
+    """
+
+    global _worker, _worker_pid
+
+    if _worker_pid == os.getpid():
+        return _worker
+
+    with _worker_lock:
+        if _worker_pid != os.getpid():
+            _worker = OutboxWorker(app)
+            _worker.start()
+            _worker_pid = os.getpid()
+
+    return _worker
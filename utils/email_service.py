@@ -1,15 +1,19 @@
 import smtplib
+import time
 from email.message import EmailMessage
 import os
 from dotenv import load_dotenv
 
+from utils.metrics import timed
+
 load_dotenv(override=True)
 
 
-def send_email(to_email, subject, body, attachments):
+def _smtp_settings():
     """
-    Sends an email with optional PDF attachments using Gmail SMTP.
-    Requires EMAIL_USER and EMAIL_PASS to be set in environment variables.
+    SMTP settings from environment variables.
+    Defaults to Gmail over SSL; EMAIL_HOST / EMAIL_PORT / EMAIL_USE_SSL
+    point it at another server (e.g. a local test SMTP server).
     """
 
     email_user = os.environ.get("EMAIL_USER")
@@ -20,14 +24,29 @@ def send_email(to_email, subject, body, attachments):
             "EMAIL_USER or EMAIL_PASS is not set in environment variables."
         )
 
+    return {
+        "host": os.environ.get("EMAIL_HOST", "smtp.gmail.com"),
+        "port": int(os.environ.get("EMAIL_PORT", "465")),
+        "use_ssl": os.environ.get("EMAIL_USE_SSL", "1") == "1",
+        "user": email_user,
+        "password": email_pass,
+    }
+
+
+def build_message(from_email, to_email, subject, body, attachments):
+    """
+    Builds an EmailMessage with optional PDF attachments.
+    Missing or unreadable attachments are skipped.
+    """
+
     msg = EmailMessage()
-    msg["From"] = email_user
+    msg["From"] = from_email
     msg["To"] = to_email
     msg["Subject"] = subject
     msg.set_content(body)
 
     # Attach files safely
-    for file_path in attachments:
+    for file_path in attachments or []:
         if not file_path or not os.path.exists(file_path):
             continue  # Skip missing files
 
@@ -46,10 +65,103 @@ def send_email(to_email, subject, body, attachments):
             # Do not break email for attachment failure
             print(f"[EMAIL WARNING] Could not attach {file_path}: {e}")
 
-    # Send email
+    return msg
+
+
+class SMTPConnection:
+    """
+    Keeps one authenticated SMTP session open between sends.
+
+    The session is reopened when it has been idle longer than
+    `idle_timeout` seconds or the server has dropped it.
+    """
+
+    def __init__(self, idle_timeout=60, timeout=20):
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._smtp = None
+        self._last_used = 0.0
+        self._settings = None
+
+    @property
+    def from_email(self):
+        if self._settings is None:
+            self._settings = _smtp_settings()
+        return self._settings["user"]
+
+    def _connect(self):
+        self._settings = settings = _smtp_settings()
+
+        if settings["use_ssl"]:
+            smtp = smtplib.SMTP_SSL(
+                settings["host"], settings["port"], timeout=self.timeout
+            )
+        else:
+            smtp = smtplib.SMTP(
+                settings["host"], settings["port"], timeout=self.timeout
+            )
+
+        try:
+            smtp.login(settings["user"], settings["password"])
+        except Exception:
+            smtp.close()
+            raise
+
+        self._smtp = smtp
+
+    def _ensure_connected(self):
+        if self._smtp is not None and \
+                time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+        if self._smtp is None:
+            self._connect()
+
+    @timed("send_email")
+    def send(self, msg):
+        self._ensure_connected()
+
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # server closed our idle session: reconnect once and retry
+            self.close()
+            self._connect()
+            self._smtp.send_message(msg)
+
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        finally:
+            self._smtp = None
+
+
+def send_email(to_email, subject, body, attachments):
+    """
+    Sends an email with optional PDF attachments using Gmail SMTP.
+    Requires EMAIL_USER and EMAIL_PASS to be set in environment variables.
+
+    Opens a one-off connection; purchase emails go through the outbox
+    (utils/email_outbox.py) instead.
+    """
+
+    connection = SMTPConnection()
+
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=20) as smtp:
-            smtp.login(email_user, email_pass)
-            smtp.send_message(msg)
+        msg = build_message(
+            connection.from_email, to_email, subject, body, attachments
+        )
+        connection.send(msg)
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to send email via SMTP: {e}")
+    finally:
+        connection.close()
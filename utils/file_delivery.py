@@ -0,0 +1,143 @@
+"""
+Sends uploaded files in one of three modes (FILE_DELIVERY):
+
+- "direct": Flask streams the file itself, with a strong ETag,
+  conditional GET (304) and Range (206) support.
+- "x-accel": nginx serves the bytes. The app only answers with an
+  X-Accel-Redirect to FILE_ACCEL_PREFIX + the path under uploads/, e.g.
+
+      location /_protected/ {
+          internal;
+          alias /srv/school/uploads/;
+      }
+
+- "x-sendfile": Apache mod_xsendfile / lighttpd serve the absolute path
+  given in X-Sendfile.
+
+Access checks stay in the Flask view in every mode.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+DELIVERY_MODES = ("direct", "x-accel", "x-sendfile")
+
+
+def _cache_headers(response, immutable, private):
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = current_app.config["FILE_CACHE_MAX_AGE"]
+        response.cache_control.immutable = True
+    else:
+        # cheap revalidation against the ETag on every use
+        response.cache_control.no_cache = True
+
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+
+
+def send_upload(folder, filename, as_attachment=False, download_name=None,
+                immutable=False, private=False, etag=True):
+    """
+    Sends `filename` from upload `folder` using the configured delivery mode.
+
+    immutable: the file at this name never changes, so clients may cache
+               it for FILE_CACHE_MAX_AGE without revalidating.
+    private:   keep it out of shared caches (paid downloads).
+    etag:      True for Werkzeug's (mtime, size, path) tag, or a string
+               such as a content hash.
+    """
+
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mode = current_app.config["FILE_DELIVERY"]
+    download_name = download_name or os.path.basename(path)
+
+    if mode == "x-accel":
+        relative = os.path.relpath(path, current_app.config["UPLOAD_ROOT"])
+        mimetype = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = (
+            current_app.config["FILE_ACCEL_PREFIX"].rstrip("/") + "/" +
+            quote(relative.replace(os.sep, "/"))
+        )
+        if as_attachment:
+            response.headers.set(
+                "Content-Disposition", "attachment", filename=download_name
+            )
+    else:
+        # x-sendfile is handled by Flask itself through USE_X_SENDFILE
+        response = send_file(
+            path,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=etag,
+            max_age=None
+        )
+
+    _cache_headers(response, immutable, private)
+    return response
+
+
+def send_data(data, mimetype, etag, immutable=False, private=False):
+    """Sends in-memory bytes with the same caching rules as send_upload()."""
+    response = current_app.response_class(data, mimetype=mimetype)
+    response.set_etag(etag)
+    _cache_headers(response, immutable, private)
+    return response.make_conditional(request)
+
+
+def send_precompressed(folder, filename):
+    """
+    Sends a built, content-hashed static file (utils/assets.py) as
+    immutable, picking its .br or .gz sibling when the client accepts it.
+    """
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if candidate in request.accept_encodings and os.path.isfile(path + suffix):
+            encoding = candidate
+            path += suffix
+            break
+
+    response = send_file(
+        path,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        conditional=True,
+        etag=True,
+        max_age=None
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+
+    _cache_headers(response, immutable=True, private=False)
+    return response
+
+
+def send_blob(digest, download_name, as_attachment=True, private=False):
+    """
+    Sends a content-addressed upload (utils/blob_store.py). Its content
+    can never change, so the digest is the ETag and it is immutable.
+    """
+    return send_upload(
+        os.path.join(current_app.config["BLOB_FOLDER"], digest[:2]),
+        digest,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        immutable=True,
+        private=private,
+        etag=digest
+    )
@@ -0,0 +1,126 @@
+"""
+Resized WebP / JPEG copies of faculty photos.
+
+Camera photos are rotated upright from their EXIF orientation, then saved
+at each of WIDTHS (never upscaled) as <stem>-<width>.webp and
+<stem>-<width>.jpg. Pillow writes no metadata unless asked, so EXIF
+(including GPS) is dropped. Templates pick a size through srcset.
+"""
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+from models import db
+from models.faculty import Faculty
+
+WIDTHS = (240, 480, 960)
+FORMATS = {
+    # extension -> Pillow save options
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def variant_name(stem, width, ext):
+    return f"{stem}-{width}.{ext}"
+
+
+def make_variants(source, folder, stem):
+    """
+    Writes every variant of the image at `source` (a path or file object)
+    into `folder`. Returns the widths written, smallest first.
+    """
+    from PIL import Image, ImageOps  # Pillow loads on first upload
+
+    try:
+        opened = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ValueError(str(e))
+
+    with opened as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            # flatten transparency onto white for JPEG
+            background = Image.new("RGB", image.size, "white")
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+
+        # every width up to the original's (small photos get one copy)
+        widths = [w for w in WIDTHS if w <= image.width] or [image.width]
+
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for ext, options in FORMATS.items():
+                path = os.path.join(folder, variant_name(stem, width, ext))
+                resized.save(path + ".tmp", **options)
+                os.replace(path + ".tmp", path)
+
+    return widths
+
+
+def new_stem(filename):
+    """Unique file stem for an upload (two uploads of IMG_0001.jpg don't clash)."""
+    stem = os.path.splitext(secure_filename(filename))[0] or "photo"
+    return f"{stem[:40]}-{uuid.uuid4().hex[:8]}"
+
+
+def remove_variants(folder, stem, widths):
+    for width in widths:
+        for ext in FORMATS:
+            path = os.path.join(folder, variant_name(stem, width, ext))
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# ---------------- BACKFILL ----------------
+def _convert(job):
+    # runs in a pool process: Pillow only, no database
+    faculty_id, source, folder, stem = job
+    try:
+        return faculty_id, make_variants(source, folder, stem), None
+    except Exception as e:
+        return faculty_id, None, str(e)
+
+
+def convert_faculty_photos(folder, jobs=None):
+    """
+    Makes variants for photos uploaded before the resizer, across `jobs`
+    processes (default: one per CPU). Commits per row, then deletes the
+    original files. Returns (converted, {faculty id: error}).
+    """
+
+    work = []
+    for row in Faculty.query.filter(Faculty.image_stem.is_(None)).all():
+        path = os.path.join(folder, row.image)
+        if os.path.isfile(path):
+            work.append((row.id, path, folder, new_stem(row.image)))
+
+    sources = {faculty_id: path for faculty_id, path, _, _ in work}
+    stems = {faculty_id: stem for faculty_id, _, _, stem in work}
+
+    converted = 0
+    failed = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for faculty_id, widths, error in pool.map(_convert, work):
+            if error:
+                failed[faculty_id] = error
+                continue
+
+            row = db.session.get(Faculty, faculty_id)
+            row.image = variant_name(stems[faculty_id], widths[-1], "jpg")
+            row.image_stem = stems[faculty_id]
+            row.image_widths = ",".join(map(str, widths))
+            db.session.commit()
+            converted += 1
+
+    # rows that failed (or shared a file with one) still link the original
+    keep = {sources[faculty_id] for faculty_id in failed}
+    for path in set(sources.values()) - keep:
+        os.remove(path)
+
+    return converted, failed
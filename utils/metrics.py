@@ -0,0 +1,369 @@
+"""
+Request metrics in Prometheus text format.
+
+Each process keeps its own counters and histograms in memory and writes
+a snapshot to METRICS_DIR/<pid>-<start>.json at most every
+METRICS_FLUSH_INTERVAL seconds. /metrics adds up every snapshot in the
+folder, so one scrape covers all gunicorn workers (including workers
+that have since exited; counters never go down until the next deploy
+clears the folder). Each scrape folds the snapshots of exited workers
+into exited.json, so recycling workers (max_requests) does not leave
+one file per worker lifetime behind.
+
+Recorded:
+- request count and duration per endpoint
+- template render time
+- SQL statement count and time per endpoint, plus a slow-query log
+- time spent in functions wrapped with @timed
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # Windows dev servers run one process
+    fcntl = None
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+EXITED_KEY = "exited"
+
+# seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HELP = {
+    "school_http_requests_total": ("counter", "Requests handled, by endpoint, method and status."),
+    "school_http_request_seconds": ("histogram", "Time from request start to response, by endpoint."),
+    "school_template_render_seconds": ("histogram", "Template render time, by template."),
+    "school_sql_statements_total": ("counter", "SQL statements executed, by endpoint."),
+    "school_sql_seconds_total": ("counter", "Time spent in SQL statements, by endpoint."),
+    "school_sql_slow_statements_total": ("counter", "Statements slower than SLOW_QUERY_MS, by endpoint."),
+    "school_function_seconds": ("histogram", "Time spent in instrumented functions."),
+}
+
+
+class Registry:
+    """Counters and histograms for one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.key = f"{self.pid}-{int(time.time() * 1000)}"
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def _check_fork(self):
+        # a forked worker starts from the preloading master's copy
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels, amount=1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, h[0], h[1], h[2]] for (name, labels), h in self.histograms.items()],
+            }
+
+    def flush(self, folder, interval=0):
+        """Writes this process's snapshot if `interval` seconds have passed."""
+        now = time.monotonic()
+        if now - self.last_flush < interval:
+            return
+        self.last_flush = now
+
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{self.key}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+
+registry = Registry()
+
+
+def timed(name):
+    """Records a function's run time in school_function_seconds."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(
+                    "school_function_seconds",
+                    {"function": name},
+                    time.perf_counter() - start
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or "unmatched"
+    return "background"
+
+
+# ---------------- COLLECTION ----------------
+def init_metrics(app, *engines):
+    """Hooks request, template and SQL timing into `app` and `engines`."""
+
+    slow_seconds = app.config["SLOW_QUERY_MS"] / 1000
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            endpoint = _endpoint()
+            registry.observe(
+                "school_http_request_seconds",
+                {"endpoint": endpoint},
+                time.perf_counter() - start
+            )
+            registry.inc(
+                "school_http_requests_total",
+                {"endpoint": endpoint, "method": request.method, "status": str(response.status_code)}
+            )
+
+        registry.flush(app.config["METRICS_DIR"], app.config["METRICS_FLUSH_INTERVAL"])
+        return response
+
+    def template_started(sender, template, context, **extra):
+        g.setdefault("metrics_templates", {})[template.name] = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        start = g.get("metrics_templates", {}).pop(template.name, None)
+        if start is not None:
+            registry.observe(
+                "school_template_render_seconds",
+                {"template": template.name or "string"},
+                time.perf_counter() - start
+            )
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    for engine in engines:
+        _instrument_engine(app, engine, slow_seconds)
+
+
+def _instrument_engine(app, engine, slow_seconds):
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "handle_error")
+    def drop_statement(context):
+        starts = context.connection.info.get("metrics_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+        labels = {"endpoint": _endpoint()}
+
+        registry.inc("school_sql_statements_total", labels)
+        registry.inc("school_sql_seconds_total", labels, elapsed)
+
+        if elapsed >= slow_seconds:
+            registry.inc("school_sql_slow_statements_total", labels)
+            app.logger.warning(
+                "Slow query (%.0f ms) in %s: %s",
+                elapsed * 1000, labels["endpoint"], " ".join(statement.split())[:500]
+            )
+
+
+# ---------------- EXPOSITION ----------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add_snapshot(counters, histograms, snapshot):
+    for name, labels, value in snapshot.get("counters", []):
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0.0) + value
+
+    for name, labels, buckets, total, count in snapshot.get("histograms", []):
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+        merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+        merged[1] += total
+        merged[2] += count
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _folder_lock(folder):
+    """Serializes folding and reading the snapshots across processes."""
+    if fcntl is None:
+        yield
+        return
+
+    with open(os.path.join(folder, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _fold_exited(folder):
+    """
+    Adds the snapshots of exited processes into exited.json and deletes
+    them. exited.json lists the keys it folded, so if the process dies
+    before deleting them they are skipped rather than counted twice.
+    """
+
+    exited_path = os.path.join(folder, f"{EXITED_KEY}.json")
+    exited = _read_snapshot(exited_path) or {}
+    already_folded = set(exited.get("folded", []))
+
+    dead = []
+    for path in glob.glob(os.path.join(folder, "*.json")):
+        key = os.path.basename(path)[:-len(".json")]
+        pid = key.partition("-")[0]
+        if key != EXITED_KEY and pid.isdigit() and not _pid_alive(int(pid)):
+            dead.append((key, path))
+
+    if not dead:
+        return
+
+    counters = {}
+    histograms = {}
+    _add_snapshot(counters, histograms, exited)
+
+    folded = []
+    for key, path in dead:
+        if key not in already_folded:
+            snapshot = _read_snapshot(path)
+            if snapshot is None:
+                continue
+            _add_snapshot(counters, histograms, snapshot)
+        folded.append(key)
+
+    tmp_path = exited_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+            "histograms": [[name, labels, *h] for (name, labels), h in histograms.items()],
+            "folded": folded,
+        }, f)
+    os.replace(tmp_path, exited_path)
+
+    for key, path in dead:
+        if key in folded:
+            os.remove(path)
+
+
+def render_metrics(folder):
+    """Prometheus text for the sum of every process's snapshot in `folder`."""
+
+    registry.flush(folder)
+
+    counters = {}
+    histograms = {}
+
+    with _folder_lock(folder):
+        _fold_exited(folder)
+
+        snapshots = {}
+        for path in glob.glob(os.path.join(folder, "*.json")):
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots[os.path.basename(path)[:-len(".json")]] = snapshot
+
+    skip = set(snapshots.get(EXITED_KEY, {}).get("folded", []))
+    for key, snapshot in snapshots.items():
+        if key not in skip:
+            _add_snapshot(counters, histograms, snapshot)
+
+    lines = []
+    for name, (kind, help_text) in HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_label_text(labels)} {value:g}")
+        else:
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_label_text(labels, [('le', f'{bound:g}')])} {bucket_count}")
+                lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {total:g}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def clear_metrics(folder):
+    """Drops every snapshot (on deploy, so old workers' totals go)."""
+    for path in glob.glob(os.path.join(folder, "*.json")):
+        os.remove(path)
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session
+
+from models import db
+from models.cache_version import CacheVersion
+
+
+class PageCache:
+    """Bounded, thread-safe LRU for one worker (rendered pages, QR images)."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+page_cache = PageCache()
+
+# page groups; each has a row in cache_version
+PUBLIC_PAGES = "public_pages"
+# paid material id -> file (app.paid_material_file); bumped by deletes
+PAID_FILES = "paid_files"
+
+
+def content_version(name):
+    """Current version of a cached page group (0 if never bumped)."""
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_content_version(name):
+    """
+    Invalidates every worker's cached copies of a page group.
+    Runs in the caller's transaction, so the bump commits with the write.
+    """
+    updated = CacheVersion.query.filter_by(name=name).update(
+        {"version": CacheVersion.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        # rows are seeded by migrations; this only covers an unmigrated db
+        db.session.add(CacheVersion(name=name, version=1))
+
+
+def cached_page(group):
+    """
+    Caches a view's rendered HTML per (page, role, content version).
+    Only GET responses with status 200 are stored.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or not current_app.config["PAGE_CACHE_ENABLED"]:
+                return view(*args, **kwargs)
+
+            key = (
+                request.full_path,
+                session.get("role"),
+                content_version(group)
+            )
+
+            html = page_cache.get(key)
+            if html is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                html = response.get_data(as_text=True)
+                page_cache.set(key, html)
+
+            return html
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,95 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """One page of a newest-first listing plus the cursors around it."""
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor   # older rows
+        self.prev_cursor = prev_cursor   # newer rows
+        self.per_page = per_page
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, id), or None for a missing/garbled cursor."""
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = raw.decode("ascii").split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def page_size(requested, default, maximum):
+    try:
+        size = int(requested)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def keyset_paginate(query, created_col, id_col, after=None, before=None, per_page=20, row_key=None):
+    """
+    Newest-first keyset pagination on (created_col, id_col).
+
+    `after` fetches the page of older rows following that cursor,
+    `before` the page of newer rows preceding it. Each page is one
+    indexed range query, however many rows the table holds.
+
+    `row_key` maps a result row to its (created_at, id) when the query
+    does not return plain model instances (e.g. joined tuples).
+    """
+
+    key = tuple_(created_col, id_col)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key:
+        rows = query.filter(key > tuple_(*before_key)).order_by(
+            created_col.asc(), id_col.asc()
+        ).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_newer, has_older = has_more, True
+    else:
+        if after_key:
+            query = query.filter(key < tuple_(*after_key))
+        rows = query.order_by(
+            created_col.desc(), id_col.desc()
+        ).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer, has_older = after_key is not None, has_more
+
+    if row_key is None:
+        def row_key(row):
+            return getattr(row, created_col.key), getattr(row, id_col.key)
+
+    def cursor_for(row):
+        return encode_cursor(*row_key(row))
+
+    return KeysetPage(
+        items=items,
+        next_cursor=cursor_for(items[-1]) if items and has_older else None,
+        prev_cursor=cursor_for(items[0]) if items and has_newer else None,
+        per_page=per_page
+    )
@@ -0,0 +1,219 @@
+"""
+On-demand sampling profiler for single requests.
+
+A request is profiled when an admin sends `X-Profile: 1` (or adds
+?profile=1), or when it is picked at random at PROFILE_SAMPLE_RATE.
+A helper thread then reads the request thread's Python stack every
+PROFILE_INTERVAL_MS until the response is ready. Nothing is started or
+hooked for other requests.
+
+Each profile is saved as JSON in PROFILE_DIR with collapsed stacks
+(flamegraph.pl / speedscope format) and a top-functions table; only
+the newest PROFILE_KEEP files are kept.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, session
+
+TOP_FUNCTIONS = 30
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    path = code.co_filename
+    # keep the part that identifies the module
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    else:
+        path = os.path.relpath(path) if os.path.isabs(path) else path
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a helper thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+
+            # collapsed stacks list the root first
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top_functions(self, limit=TOP_FUNCTIONS):
+        """[(function, self samples, total samples)], most self time first."""
+        own = Counter()
+        total = Counter()
+
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+
+        ranked = sorted(total, key=lambda name: (own[name], total[name]), reverse=True)
+        return [(name, own[name], total[name]) for name in ranked[:limit]]
+
+
+# ---------------- STORAGE ----------------
+def save_profile(folder, keep, profiler, details):
+    """Writes one profile and drops the oldest beyond `keep`."""
+
+    os.makedirs(folder, exist_ok=True)
+
+    profile_id = f"{datetime.utcnow():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+    profile = dict(
+        details,
+        id=profile_id,
+        duration_ms=round(profiler.duration * 1000, 1),
+        interval_ms=profiler.interval * 1000,
+        samples=profiler.samples,
+        top=profiler.top_functions(),
+        stacks=dict(profiler.stacks),
+    )
+
+    path = os.path.join(folder, f"{profile_id}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f)
+    os.replace(path + ".tmp", path)
+
+    # ids start with the time, so name order is age order
+    for old in sorted(name for name in os.listdir(folder) if name.endswith(".json"))[:-keep]:
+        try:
+            os.remove(os.path.join(folder, old))
+        except FileNotFoundError:
+            pass
+
+    return profile_id
+
+
+def _profile_path(folder, profile_id):
+    # ids are generated above; anything else is not a profile
+    if not all(c.isalnum() or c == "-" for c in profile_id):
+        return None
+    return os.path.join(folder, f"{profile_id}.json")
+
+
+def load_profile(folder, profile_id):
+    path = _profile_path(folder, profile_id)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_profiles(folder):
+    """Saved profiles, newest first, without their stacks."""
+    if not os.path.isdir(folder):
+        return []
+
+    profiles = []
+    for name in sorted(os.listdir(folder), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        profile = load_profile(folder, name[:-len(".json")])
+        if profile:
+            profile.pop("stacks", None)
+            profile.pop("top", None)
+            profiles.append(profile)
+    return profiles
+
+
+def collapsed_stacks(profile):
+    """Text for flamegraph.pl / speedscope: one 'stack count' per line."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+# ---------------- FLASK HOOKS ----------------
+def _requested():
+    if request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1":
+        return session.get("role") == "admin"
+    return False
+
+
+def init_profiler(app):
+    """Profiles flagged or randomly sampled requests of `app`."""
+
+    def finish(status):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+
+        profiler.stop()
+        save_profile(
+            app.config["PROFILE_DIR"],
+            app.config["PROFILE_KEEP"],
+            profiler,
+            {
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "path": request.full_path.rstrip("?"),
+                "status": status,
+                "trigger": g.pop("profile_trigger"),
+                "started_at": g.pop("profile_started").isoformat(timespec="seconds"),
+            }
+        )
+
+    @app.before_request
+    def start_profiler():
+        rate = app.config["PROFILE_SAMPLE_RATE"]
+
+        if _requested():
+            trigger = "admin"
+        elif rate and random.random() < rate:
+            trigger = "sampled"
+        else:
+            return
+
+        g.profile_trigger = trigger
+        g.profile_started = datetime.utcnow()
+        g.profiler = SamplingProfiler(
+            threading.get_ident(),
+            app.config["PROFILE_INTERVAL_MS"] / 1000
+        )
+        g.profiler.start()
+
+    @app.after_request
+    def stop_profiler(response):
+        finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def stop_failed_profiler(exc):
+        # after_request is skipped when the view raised
+        if "profiler" in g:
+            finish(500)
@@ -1,12 +1,42 @@
-import qrcode
+import glob
+import hashlib
+import io
 import os
 
+from utils.metrics import timed
+from utils.page_cache import PageCache
 
-def generate_upi_qr(upi_link, save_path):
+# upi link -> encoded PNG bytes
+qr_cache = PageCache(max_entries=256)
+
+
+def upi_link(upi_id, upi_name, amount):
+    """UPI deep link for paying `amount` to the school."""
+    return (
+        f"upi://pay?"
+        f"pa={upi_id}"
+        f"&pn={upi_name.replace(' ', '%20')}"
+        f"&am={amount}"
+        f"&cu=INR"
+        f"&tn=Paid%20Study%20Material"
+    )
+
+
+def upi_qr_key(upi_link):
+    """Short, stable name for a link's QR image (used in its URL)."""
+    return hashlib.sha256(upi_link.encode()).hexdigest()[:16]
+
+
+@timed("render_upi_qr")
+def render_upi_qr(upi_link):
     """
     Generates a QR code image from UPI deep link.
+    Returns the PNG bytes.
     """
 
+    # qrcode (and PIL) load on the first render, not at app import
+    import qrcode
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_Q,
@@ -18,4 +48,31 @@ def generate_upi_qr(upi_link, save_path):
     qr.make(fit=True)
 
     img = qr.make_image(fill_color="black", back_color="white")
-    img.save(save_path)
+
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def upi_qr_png(upi_link):
+    """QR PNG bytes for `upi_link`, rendered once per worker."""
+    png = qr_cache.get(upi_link)
+    if png is None:
+        png = render_upi_qr(upi_link)
+        qr_cache.set(upi_link, png)
+    return png
+
+
+def evict_qr_files(folder, material_id=None):
+    """
+    Removes QR images written to disk before they were cached in memory
+    (upi_qr_<material>_<price>.png): all of them, or one material's.
+    """
+
+    pattern = f"upi_qr_{material_id}_*.png" if material_id else "upi_qr_*.png"
+
+    for path in glob.glob(os.path.join(folder, pattern)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
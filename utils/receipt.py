@@ -1,16 +1,60 @@
 from datetime import datetime
+from functools import lru_cache
+import hashlib
 import os
+import zlib
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFDictionary, PDFName, PDFStream, pdfdocEnc
 from reportlab.pdfgen import canvas
 
+from utils.metrics import timed
+
+
+# Colors
+GREEN = colors.HexColor("#0b6e3f")
+LIGHT_GREEN = colors.HexColor("#e8f5e9")
+DARK = colors.HexColor("#1f2933")
+MUTED = colors.HexColor("#6b7280")
+# 4.5% black over a white page, as a plain colour so the watermark
+# needs no transparency state and can live in the cached template
+WATERMARK_GREY = colors.Color(0.955, 0.955, 0.955)
+
+# Layout constants
+WIDTH, HEIGHT = A4
+MARGIN_X = 2.0 * cm
+TOP_Y = HEIGHT - 2.2 * cm
+CONTENT_W = WIDTH - 2 * MARGIN_X
+HEADER_H = 3.2 * cm
+ROW_H = 0.9 * cm
+COL_ITEM = MARGIN_X
+COL_PRICE = MARGIN_X + CONTENT_W - 4.2 * cm
+COL_TOTAL = MARGIN_X + CONTENT_W - 0.6 * cm
+
+BILL_Y = TOP_Y - HEADER_H - 1.0 * cm
+TABLE_TOP = BILL_Y - 0.55 * cm - 0.9 * cm
+ITEM_TOP = TABLE_TOP - ROW_H
+TOTALS_Y = ITEM_TOP - ROW_H - 1.0 * cm
+INFO_Y = TOTALS_Y - 2.8 * cm
+INFO_H = 2.4 * cm
+
+# Logo (keep path as-is; fallback if missing)
+LOGO_PATH = "static/images/logo.png"
+
+TEMPLATE_FORM = "ReceiptTemplate"
+
+# bump when the receipt layout changes so regenerate_receipts.py
+# rewrites every stored receipt
+LAYOUT_VERSION = "2"
+
 
 def _draw_watermark(c: canvas.Canvas, width: float, height: float) -> None:
     """Draw a subtle repeated diagonal watermark 'FSBA' across the page."""
     c.saveState()
-    c.setFillColor(colors.Color(0, 0, 0, alpha=0.045))
+    c.setFillColor(WATERMARK_GREY)
     c.setFont("Helvetica-Bold", 18)
 
     # Rotate around center and tile
@@ -26,128 +70,222 @@ def _draw_watermark(c: canvas.Canvas, width: float, height: float) -> None:
     c.restoreState()
 
 
-def generate_receipt(receipt_path, school_name, email, material, amount, utr):
-    c = canvas.Canvas(receipt_path, pagesize=A4)
-    width, height = A4
+@lru_cache(maxsize=1)
+def _logo_image():
+    """Logo decoded once per process; None when the file is missing."""
+    if os.path.exists(LOGO_PATH):
+        return ImageReader(LOGO_PATH)
+    return None
 
-    # Watermark (behind everything)
-    _draw_watermark(c, width, height)
 
-    # Colors
-    GREEN = colors.HexColor("#0b6e3f")
-    LIGHT_GREEN = colors.HexColor("#e8f5e9")
-    DARK = colors.HexColor("#1f2933")
-    MUTED = colors.HexColor("#6b7280")
+def _draw_logo(c: canvas.Canvas) -> None:
+    logo = _logo_image()
+    if logo is not None:
+        c.drawImage(logo, MARGIN_X + 0.6 * cm, TOP_Y - HEADER_H + 0.45 * cm, width=2.2 * cm, height=2.2 * cm, mask="auto")
+
 
-    # Layout constants
-    margin_x = 2.0 * cm
-    top_y = height - 2.2 * cm
-    content_w = width - 2 * margin_x
+def _draw_static(c: canvas.Canvas, school_name: str) -> None:
+    """Everything on the receipt that does not depend on the purchase."""
+
+    # Watermark (behind everything)
+    _draw_watermark(c, WIDTH, HEIGHT)
 
     # Header card
-    header_h = 3.2 * cm
     c.setFillColor(LIGHT_GREEN)
     c.setStrokeColor(colors.HexColor("#c1e3c8"))
-    c.roundRect(margin_x, top_y - header_h, content_w, header_h, 12, stroke=1, fill=1)
+    c.roundRect(MARGIN_X, TOP_Y - HEADER_H, CONTENT_W, HEADER_H, 12, stroke=1, fill=1)
 
-    # Logo (keep path as-is; fallback if missing)
-    logo_path = "static/images/logo.png"
-    if os.path.exists(logo_path):
-        c.drawImage(logo_path, margin_x + 0.6 * cm, top_y - header_h + 0.45 * cm, width=2.2 * cm, height=2.2 * cm, mask="auto")
+    _draw_logo(c)
 
     c.setFillColor(GREEN)
     c.setFont("Helvetica", 16)
-    c.drawString(margin_x + 3.2 * cm, top_y - 1.2 * cm, school_name)
+    c.drawString(MARGIN_X + 3.2 * cm, TOP_Y - 1.2 * cm, school_name)
 
     c.setFillColor(DARK)
     c.setFont("Helvetica", 10)
-    c.drawString(margin_x + 3.2 * cm, top_y - 2.0 * cm, "Payment Receipt / Invoice")
-
-    # Invoice meta
-    invoice_no = f"INV-{datetime.now().strftime('%Y%m%d')}-{str(utr)[-6:]}"
-    invoice_date = datetime.now().strftime("%d-%m-%Y %H:%M")
-
-    c.setFillColor(MUTED)
-    c.setFont("Helvetica", 9)
-    c.drawRightString(margin_x + content_w - 0.6 * cm, top_y - 1.7 * cm, f"Invoice No: {invoice_no}")
-    c.drawRightString(margin_x + content_w - 0.6 * cm, top_y - 2.0 * cm, f"Date: {invoice_date}")
+    c.drawString(MARGIN_X + 3.2 * cm, TOP_Y - 2.0 * cm, "Payment Receipt / Invoice")
 
-    # Bill-to block
-    y = top_y - header_h - 1.0 * cm
+    # Bill-to label
     c.setFillColor(DARK)
     c.setFont("Helvetica-Bold", 11)
-    c.drawString(margin_x, y, "Bill To")
-    y -= 0.55 * cm
+    c.drawString(MARGIN_X, BILL_Y, "Bill To")
 
-    c.setFont("Helvetica", 10)
-    c.setFillColor(DARK)
-    c.drawString(margin_x, y, email)
-    y -= 0.9 * cm
-
-    # Items table
-    table_top = y
-    row_h = 0.9 * cm
-    col_item = margin_x
-    col_price = margin_x + content_w - 4.2 * cm
-    col_total = margin_x + content_w - 0.6 * cm
-
-    # Header row
+    # Items table header row
     c.setFillColor(GREEN)
     c.setStrokeColor(GREEN)
-    c.roundRect(margin_x, table_top - row_h, content_w, row_h, 8, stroke=1, fill=1)
+    c.roundRect(MARGIN_X, TABLE_TOP - ROW_H, CONTENT_W, ROW_H, 8, stroke=1, fill=1)
     c.setFillColor(colors.white)
     c.setFont("Helvetica-Bold", 10)
-    c.drawString(col_item + 0.35 * cm, table_top - 0.62 * cm, "Item")
-    c.drawString(col_price, table_top - 0.62 * cm, "Price")
-    c.drawRightString(col_total, table_top - 0.62 * cm, "Total")
+    c.drawString(COL_ITEM + 0.35 * cm, TABLE_TOP - 0.62 * cm, "Item")
+    c.drawString(COL_PRICE, TABLE_TOP - 0.62 * cm, "Price")
+    c.drawRightString(COL_TOTAL, TABLE_TOP - 0.62 * cm, "Total")
 
-    # Item row
-    table_top -= row_h
+    # Item row box
     c.setFillColor(colors.white)
     c.setStrokeColor(colors.HexColor("#e2e8f0"))
-    c.roundRect(margin_x, table_top - row_h, content_w, row_h, 8, stroke=1, fill=1)
-    c.setFillColor(DARK)
-    c.setFont("Helvetica", 10)
-    c.drawString(col_item + 0.35 * cm, table_top - 0.62 * cm, material.title)
-    c.drawString(col_price, table_top - 0.62 * cm, f"Rs. {amount}")
-    c.drawRightString(col_total, table_top - 0.62 * cm, f"Rs. {amount}")
+    c.roundRect(MARGIN_X, ITEM_TOP - ROW_H, CONTENT_W, ROW_H, 8, stroke=1, fill=1)
 
-    # Totals block
-    totals_y = table_top - row_h - 1.0 * cm
+    # Totals labels
     c.setFont("Helvetica", 10)
     c.setFillColor(MUTED)
-    c.drawRightString(col_total, totals_y, "Subtotal")
-    c.setFillColor(DARK)
-    c.drawRightString(col_total, totals_y - 0.55 * cm, f"Rs. {amount}")
-
-    c.setFillColor(MUTED)
-    c.drawRightString(col_total, totals_y - 1.2 * cm, "Total Amount")
-    c.setFillColor(GREEN)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawRightString(col_total, totals_y - 1.85 * cm, f"Rs. {amount}")
+    c.drawRightString(COL_TOTAL, TOTALS_Y, "Subtotal")
+    c.drawRightString(COL_TOTAL, TOTALS_Y - 1.2 * cm, "Total Amount")
 
     # Payment info card
-    info_y = totals_y - 2.8 * cm
-    info_h = 2.4 * cm
     c.setFillColor(colors.HexColor("#f5faf6"))
     c.setStrokeColor(colors.HexColor("#e2e8f0"))
-    c.roundRect(margin_x, info_y - info_h, content_w, info_h, 12, stroke=1, fill=1)
+    c.roundRect(MARGIN_X, INFO_Y - INFO_H, CONTENT_W, INFO_H, 12, stroke=1, fill=1)
 
     c.setFillColor(DARK)
     c.setFont("Helvetica-Bold", 10)
-    c.drawString(margin_x + 0.6 * cm, info_y - 0.7 * cm, "Payment Details")
+    c.drawString(MARGIN_X + 0.6 * cm, INFO_Y - 0.7 * cm, "Payment Details")
 
     c.setFont("Helvetica", 9)
     c.setFillColor(MUTED)
-    c.drawString(margin_x + 0.6 * cm, info_y - 1.35 * cm, f"Mode: UPI")
-    c.drawString(margin_x + 0.6 * cm, info_y - 1.95 * cm, f"UTR / Transaction ID: {utr}")
-    c.drawRightString(margin_x + content_w - 0.6 * cm, info_y - 1.35 * cm, "Status: PAYMENT RECEIVED")
+    c.drawString(MARGIN_X + 0.6 * cm, INFO_Y - 1.35 * cm, "Mode: UPI")
+    c.drawRightString(MARGIN_X + CONTENT_W - 0.6 * cm, INFO_Y - 1.35 * cm, "Status: PAYMENT RECEIVED")
 
     # Footer note
-    footer_y = 1.8 * cm
     c.setFillColor(MUTED)
     c.setFont("Helvetica", 9)
-    c.drawCentredString(width / 2, footer_y, "Thank you for your payment. This is a computer-generated invoice; no signature required.")
+    c.drawCentredString(WIDTH / 2, 1.8 * cm, "Thank you for your payment. This is a computer-generated invoice; no signature required.")
+
+
+def _draw_fields(c: canvas.Canvas, email, material, amount, utr, issued_at=None) -> None:
+    """The per-purchase parts: invoice meta, bill-to, item, totals, UTR."""
+
+    # Invoice meta
+    issued_at = issued_at or datetime.now()
+    invoice_no = f"INV-{issued_at.strftime('%Y%m%d')}-{str(utr)[-6:]}"
+    invoice_date = issued_at.strftime("%d-%m-%Y %H:%M")
+
+    c.setFillColor(MUTED)
+    c.setFont("Helvetica", 9)
+    c.drawRightString(MARGIN_X + CONTENT_W - 0.6 * cm, TOP_Y - 1.7 * cm, f"Invoice No: {invoice_no}")
+    c.drawRightString(MARGIN_X + CONTENT_W - 0.6 * cm, TOP_Y - 2.0 * cm, f"Date: {invoice_date}")
+
+    # Bill-to email
+    c.setFont("Helvetica", 10)
+    c.setFillColor(DARK)
+    c.drawString(MARGIN_X, BILL_Y - 0.55 * cm, email)
+
+    # Item row
+    c.drawString(COL_ITEM + 0.35 * cm, ITEM_TOP - 0.62 * cm, material.title)
+    c.drawString(COL_PRICE, ITEM_TOP - 0.62 * cm, f"Rs. {amount}")
+    c.drawRightString(COL_TOTAL, ITEM_TOP - 0.62 * cm, f"Rs. {amount}")
+
+    # Totals
+    c.drawRightString(COL_TOTAL, TOTALS_Y - 0.55 * cm, f"Rs. {amount}")
+    c.setFillColor(GREEN)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawRightString(COL_TOTAL, TOTALS_Y - 1.85 * cm, f"Rs. {amount}")
+
+    # UTR
+    c.setFont("Helvetica", 9)
+    c.setFillColor(MUTED)
+    c.drawString(MARGIN_X + 0.6 * cm, INFO_Y - 1.95 * cm, f"UTR / Transaction ID: {utr}")
+
+
+class _ReceiptTemplate:
+    """
+    The static part of the receipt, drawn once and kept as a compressed
+    PDF content stream. Each receipt places it as a form XObject instead
+    of redrawing the watermark and chrome call by call.
+    """
+
+    def __init__(self, school_name):
+        scratch = canvas.Canvas(os.devnull, pagesize=A4)
+        scratch.beginForm(TEMPLATE_FORM)
+        _draw_static(scratch, school_name)
+
+        # same stream endForm() would build, compressed once per process
+        self.contents = zlib.compress(pdfdocEnc("\n".join([scratch._preamble] + scratch._code)))
+        # internal font names (/F1, /F2 ...) the recorded stream refers to
+        self.fonts = sorted(scratch._doc.fontMapping.items(), key=lambda item: int(item[1][2:]))
+
+    def stamp(self, c: canvas.Canvas) -> bool:
+        """
+        Places the template on `c`. Returns False (drawing nothing) if the
+        canvas would name the fonts differently from the recording, or if
+        reportlab's internals no longer look the way this code expects.
+        """
+        try:
+            doc = c._doc
+            for font, internal_name in self.fonts:
+                if doc.getInternalFontName(font) != internal_name:
+                    return False
+            objects = doc.idToObject
+            xobject_name = doc.getXObjectName
+        except AttributeError:
+            return False
+
+        # the logo still has to be registered with this document
+        c.beginForm(TEMPLATE_FORM)
+        _draw_logo(c)
+        c.endForm()
+
+        try:
+            form = objects[xobject_name(TEMPLATE_FORM)]
+        except (AttributeError, KeyError):
+            return False
+
+        form.Contents = PDFStream(
+            PDFDictionary({"Filter": PDFName("FlateDecode")}),
+            self.contents
+        )
+        form.compression = 0
+
+        c.doForm(TEMPLATE_FORM)
+        return True
+
+
+@lru_cache(maxsize=8)
+def _receipt_template(school_name):
+    """The cached template, or None if this reportlab can't record one."""
+    try:
+        return _ReceiptTemplate(school_name)
+    except (AttributeError, ValueError):
+        # the recording reads canvas internals a reportlab upgrade may rename
+        return None
+
+
+@lru_cache(maxsize=8)
+def receipt_fingerprint(school_name):
+    """
+    Identifies the layout a receipt was drawn with: layout version,
+    school name and logo. Stored in the PDF keywords.
+    """
+    digest = hashlib.sha1(f"{LAYOUT_VERSION}|{school_name}".encode("utf-8"))
+
+    if os.path.exists(LOGO_PATH):
+        with open(LOGO_PATH, "rb") as f:
+            digest.update(f.read())
+
+    return f"receipt-layout-{digest.hexdigest()}"
+
+
+def receipt_is_current(receipt_path, school_name):
+    """True if the receipt exists and was drawn with the current layout."""
+    try:
+        with open(receipt_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+
+    # the document info dictionary is written uncompressed
+    return receipt_fingerprint(school_name).encode("ascii") in data
+
+
+@timed("generate_receipt")
+def generate_receipt(receipt_path, school_name, email, material, amount, utr, issued_at=None):
+    c = canvas.Canvas(receipt_path, pagesize=A4)
+    c.setKeywords(receipt_fingerprint(school_name))
+
+    template = _receipt_template(school_name)
+    if template is None or not template.stamp(c):
+        _draw_static(c, school_name)
+
+    _draw_fields(c, email, material, amount, utr, issued_at)
 
     c.showPage()
     c.save()